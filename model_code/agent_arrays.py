@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class AgentArrays:
+    """Structure-of-arrays storage for the walking state of all agents of a model.
+        Used by the 'arrays' engine of the model (model parameter 'engine'), where agents of type
+        ArrayPedestrian keep the attributes listed in FIELDS in these arrays instead of in the agent objects.
+        Each agent owns one index of the arrays, given in order of agent creation.
+
+    Args:
+        size (int): Number of agents
+    """
+
+    # attribute name and data type of all array backed agent attributes
+    FIELDS = {
+        'remaining_dist_on_edge': np.float64,
+        'walking_distance': np.float64,
+        'len_traversed': np.float64,
+        'metric_path_length': np.float64,
+        'finished': np.bool_,
+    }
+
+    def __init__(self, size):
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(size, dtype=dtype))
+        self.size = 0
+
+    def add_agent(self):
+        """Reserve the next free index for a new agent.
+
+        Returns:
+            int: Index of the agent in all arrays
+        """
+        index = self.size
+        self.size += 1
+        return index
+
+    def walking_beyond_next_node(self, active):
+        """Check for all active agents whether they reach the next intersection within this timestep.
+
+        Args:
+            active (numpy.ndarray): Boolean mask of agents that walk in this timestep
+
+        Returns:
+            numpy.ndarray, numpy.ndarray: Boolean masks of agents stopping at the next node and
+                agents that keep walking on their edge for the full timestep
+        """
+        beyond = active & (self.walking_distance > self.remaining_dist_on_edge)
+        return beyond, active & ~beyond
+
+    def walk_full_timestep(self, mask):
+        """Array version of the distance updates of Pedestrian.stop_walking_after_timestep for all agents in mask.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of agents walking on their edge for the full timestep
+        """
+        walking_distance = self.walking_distance[mask]
+        self.len_traversed[mask] += walking_distance
+        self.metric_path_length[mask] -= walking_distance
+        self.remaining_dist_on_edge[mask] -= walking_distance
+
+
+def array_attribute(name):
+    """Create a property storing the agent attribute name in the model's AgentArrays at the index of the agent.
+
+    Args:
+        name (str): Name of the attribute, must be a key of AgentArrays.FIELDS
+
+    Returns:
+        property: The attribute property
+    """
+    def fget(agent):
+        # convert to python type, so that values reported by agents stay plain floats and booleans
+        return getattr(agent.model.agent_arrays, name)[agent.index].item()
+
+    def fset(agent, value):
+        getattr(agent.model.agent_arrays, name)[agent.index] = value
+
+    return property(fget, fset, doc="Array backed agent attribute '%s'." % name)
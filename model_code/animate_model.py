@@ -51,6 +51,8 @@ anim_parameters = {
     'max_densities': False,
     # Add logs for debugging
     'logging': False,
+    # Animation needs the agent positions in space, so do not run headless
+    'headless': False,
 }
 
 from IPython.display import HTML
@@ -5,17 +5,18 @@ import random
 import geopandas
 import pandas as pd
 import momepy
-import datetime
-from collections import Counter
 import math
 import numpy as np
 from pathlib import Path
-from shapely.ops import substring, Point, LineString
 
 # Custom libs
 import movement
 import graph_helpers as gh
+import routing
 import spatial_output_creator as soc
+from agent_arrays import AgentArrays, array_attribute
+from scheduler import AgentGroups, ArrivalScheduler
+from recorders import EdgeTimeSeries, TrajectoryRecorder
 
 class Pedestrian(ap.Agent):
 
@@ -48,7 +49,8 @@ class Pedestrian(ap.Agent):
         """ Initialize other attributes. """
         # Graph representations
         self.global_graph = self.model.G
-        self.personal_network = self.model.G.to_undirected()
+        # Undirected street network shared by all agents, origins and destinations on edges are not added to it (see gh.EdgePoint)
+        self.street_network = self.model.base_network
         # Route specific
         self.metric_path = []
         self.init_shortest_path_length = 0
@@ -66,7 +68,13 @@ class Pedestrian(ap.Agent):
         self.non_compliance_nodes = []
         self.random_rerouting_nodes = []
         self.no_route_change_nodes = []
+        # origin and destination drawn by the model for a group of agents (see DistanceKeepingModel.assign_random_ods)
+        self.pending_od = None
 
+    def init_route(self):
+        """Assigns origin and destination of the first route of the agent, computes its path and initializes its location. 
+            Called by the model after all agents have been set up.
+        """
         """ Assign origin and destination. """
         if(self.model.p.origin_destination_pairs):
             # Choose origin and destination pair from model parameters
@@ -75,16 +83,16 @@ class Pedestrian(ap.Agent):
             # Choose random origin and destination within street network
             self.assign_random_od(250, False)
 
-            # for debugging:
-            if(self.model.p.destination_log):
-                self.destination_dict = {'agentID': self.id, 'initial_dest': self.dest['point'],}
+        # for debugging:
+        if(self.model.p.destination_log):
+            self.destination_dict = {'agentID': self.id, 'initial_dest': self.dest['point'],}
 
         """ Compute initial path and set reporter attributes. """
         # Compute shortest path to destination
-        self.agent_compute_initial_shortest_path(self.orig_name, self.dest_name)
+        self.agent_compute_initial_shortest_path(self.orig_node, self.dest_node)
         # init reporter variables with agent location
         self.init_reporters()
-        self.init_pos = [self.location['geometry'].x - self.model.x_min, self.location['geometry'].y - self.model.y_min]
+        self.init_pos = [self.location['x'] - self.model.x_min, self.location['y'] - self.model.y_min]
 
     def assign_od_node_pair(self, od_pairs):
         """Assigns a random origin-destination pair from a tuple of origin-destination-tuples.
@@ -93,8 +101,12 @@ class Pedestrian(ap.Agent):
                 od_apirs (tuple): Tuple of OD-Tuples
         """        
         i = self.randomDestinationGenerator.integers(0, len(od_pairs))
-        self.orig_name = od_pairs[i][0]
-        self.dest_name = od_pairs[i][1]
+        self.orig_node = od_pairs[i][0]
+        self.dest_node = od_pairs[i][1]
+        # origin and destination are nodes, agent starts on the first edge and arrives on the last edge of the path
+        path, _ = self.model.od_routes[self.orig_node, self.dest_node]
+        self.orig = movement.node_point_dict(self.street_network, path[0], path[1])
+        self.dest = movement.node_point_dict(self.street_network, path[-1], path[-2])
         
     def assign_random_od(self, min_dist, keep_prev_dest_as_orig):
         """Assigns a random origin-destination pair within the street network, with a given minimum distance bewteen both points.
@@ -104,34 +116,37 @@ class Pedestrian(ap.Agent):
                 keep_prev_dest_as_orig (boolean): whether to keep the destination of the previous 
                     route as origin for the following route or to create new origin
         """
-        if(keep_prev_dest_as_orig):
+        if(self.pending_od is not None):
+            # use origin and destination already drawn by the model
+            self.orig, self.dest = self.pending_od
+            self.pending_od = None
+        elif(keep_prev_dest_as_orig):
             # reuse previous destination as origin and only generate new destination
             self.orig = self.dest.copy()
-            self.dest = movement.get_random_dest(self.personal_network, self.orig, self.model.edges, self.randomDestinationGenerator, min_dist)
+            self.dest = movement.get_random_dest(self.street_network, self.orig, self.model.edges, self.randomDestinationGenerator, min_dist, sampler=self.model.edge_sampler)
         else:
             # generate new origin and destination
-            self.orig, self.dest = movement.get_random_org_dest(self.personal_network, self.model.edges, self.randomDestinationGenerator, min_dist)
-        # create intermediate nodes in personal graph at origin and destination location
+            self.orig, self.dest = movement.get_random_org_dest(self.street_network, self.model.edges, self.randomDestinationGenerator, min_dist, sampler=self.model.edge_sampler)
+        # origin and destination are first and last node of the path on their edges, without adding them to the graph
         # Use the following name scheme: A{ID of Agent}S{Route Counter}, e.g. A1S1 for the origin of the first route of agent 1. 
-        self.orig_name = "A"+str(self.id)+"S"+str(self.route_counter)
+        self.orig_node = gh.edge_point(self.street_network, self.orig, "A"+str(self.id)+"S"+str(self.route_counter))
         # Use the following name scheme: A{ID of Agent}D{Route Counter}, e.g. A1D1 for the destination of the first route of agent 1. 
-        self.dest_name = "A"+str(self.id)+"D"+str(self.route_counter)
-        # Add intermediate nodes to personal graph
-        gh.add_temporary_node(self.personal_network, self.orig['nearer_node'], self.orig['remote_node'], 
-            self.orig['dist_from_nearer'], self.orig_name, self.orig['point'].x,self.orig['point'].y)
-        gh.add_temporary_node(self.personal_network, self.dest['nearer_node'], self.dest['remote_node'], 
-            self.dest['dist_from_nearer'], self.dest_name, self.dest['point'].x,self.dest['point'].y)
+        self.dest_node = gh.edge_point(self.street_network, self.dest, "A"+str(self.id)+"D"+str(self.route_counter))
 
     def agent_compute_initial_shortest_path(self, orig, dest):
         """Calculate the shortest path from the agents current location to its destination and the length of the path.
             Stores result as agent variables (list of nodes in a shortest path, float).
 
         Args:
-            start_node (int): ID of path starting node
-            dest_node (int): ID of path destination node
+            orig: Origin node or gh.EdgePoint
+            dest: Destination node or gh.EdgePoint
         """
-        self.metric_path = nx.dijkstra_path(self.personal_network, source=orig, target=dest, weight='mm_len')
-        self.metric_path_length = nx.path_weight(self.personal_network, self.metric_path, weight='mm_len')
+        if(self.model.od_routes is not None):
+            # copy the path of the origin-destination pair computed by the model
+            path, self.metric_path_length = self.model.od_routes[orig, dest]
+            self.metric_path = list(path)
+        else:
+            self.metric_path, self.metric_path_length = self.model.shortest_path(self.street_network, orig, dest)
         # store length of shortest path in agent attributes
         self.init_shortest_path_length = self.metric_path_length
 
@@ -140,31 +155,29 @@ class Pedestrian(ap.Agent):
             Also sets further attributes, such as edge counter attributes and the remaining distance to the next node. 
         """        
         # Update people counter of edge the agent is currently on by one
-        self.graph_edge = self.global_graph[self.orig['nearer_node']][self.orig['remote_node']]
-        gh.increase_edge_counter(self.graph_edge, 1)
-        self.previous_edge = self.personal_network[self.orig['nearer_node']][self.orig['remote_node']]
+        self.graph_edge_id = self.model.edge_state.edge_ids[self.orig['nearer_node'], self.orig['remote_node']]
+        gh.increase_edge_counter(self.model.edge_state, self.graph_edge_id, 1)
+        self.previous_edge = (self.orig['nearer_node'], self.orig['remote_node'])
 
         # Get the edge the agent starts on (corrected direction)
-        self.current_edge = movement.get_directed_edge(self.personal_network, self.metric_path[0], self.metric_path[1])
+        self.current_edge = self.directed_edge(self.metric_path[0], self.metric_path[1])
         
         # Set distance to next intersection (graph node)
         self.remaining_dist_on_edge = self.current_edge['mm_len']
+        self.update_node_status()
         
         # Create dict for agent location and related attributes
         self.location = {
-            'geometry': self.orig['point'],
+            'x': self.orig['point'].x,
+            'y': self.orig['point'].y,
             'agentID': self.id,
             'route_counter': self.route_counter,
-            'latest_node': self.metric_path[0],
+            'latest_node': gh.node_name(self.metric_path[0]),
             'non_compliance': False,
             'compliance': False,
             'no_route_change': False,
             'random_rerouting': False
         }
-        # if random origin is used instead of predefined od-pairs, remove intermediate node from graph
-        # shall avoid that the agent uses it in rerouting and reduce computation time
-        if(not self.model.p.origin_destination_pairs):
-            self.personal_network.remove_node(self.orig_name)
 
 
     def setup_pos(self, space):
@@ -190,7 +203,7 @@ class Pedestrian(ap.Agent):
             self.assign_random_od(250, self.model.p.reuse_previous_dest_as_orig)
 
         # Compute shortest path to destination and initalise reporter variables
-        self.agent_compute_initial_shortest_path(self.orig_name, self.dest_name)
+        self.agent_compute_initial_shortest_path(self.orig_node, self.dest_node)
         self.init_reporters()
         
 
@@ -243,26 +256,27 @@ class Pedestrian(ap.Agent):
         # increase length traversed by the remaining distance to next intersection
         self.len_traversed += self.remaining_dist_on_edge
         # Get location of next intersection
-        next_location = Point(self.personal_network.nodes[self.metric_path[1]]['pos'])
+        next_x, next_y = gh.node_pos(self.street_network, self.metric_path[1])
         # Reduce people counter of current edge by 1
-        gh.decrease_edge_counter(self.graph_edge, 1)
+        gh.decrease_edge_counter(self.model.edge_state, self.graph_edge_id, 1)
 
         # erase first node from current path list 
         prev = self.metric_path.pop(0)
         # add that node to the final chosen path
         self.final_path.append(prev)
-        if(prev in self.personal_network.nodes):    
-            # this cannot be done for the origin node, as it was removed by this time already, 
+        if(not isinstance(prev, gh.EdgePoint)):
+            # this cannot be done for an origin on an edge, as it is not a node of the street network, 
             # but previous edge was alread set during initalization (see function init_reporters()) in that case
-            self.previous_edge = self.personal_network[prev][self.metric_path[0]]  
+            self.previous_edge = (prev, self.metric_path[0])
 
         # update remaining path length
         self.metric_path_length = self.metric_path_length - self.remaining_dist_on_edge 
         # reset remaining distance
         self.remaining_dist_on_edge = 0
+        self.model.groups.arrive(self)
         # update location of agent accordingly
-        self.location.update( [('latest_node', self.metric_path[0]),('geometry', next_location)] )
-        self.space.move_to(self, [self.location['geometry'].x - self.model.x_min, self.location['geometry'].y - self.model.y_min])
+        self.location.update( [('latest_node', gh.node_name(self.metric_path[0])),('x', next_x),('y', next_y)] )
+        self.move_to_location()
 
 
     def stop_walking_after_timestep(self):
@@ -274,11 +288,26 @@ class Pedestrian(ap.Agent):
         # update remaining path length
         self.metric_path_length = self.metric_path_length - self.walking_distance 
         # update location of agent using walking distance within current timestep
+        # (the coordinates of the location are computed for all agents at once, see DistanceKeepingModel.update_locations_on_edges)
         self.remaining_dist_on_edge = self.remaining_dist_on_edge - self.walking_distance
-        # update location of agent accordingly
-        next_location = self.current_edge['geometry'].interpolate(self.current_edge['mm_len'] - self.remaining_dist_on_edge)
-        self.location.update([('geometry', next_location)])
-        self.space.move_to(self, [self.location['geometry'].x - self.model.x_min, self.location['geometry'].y - self.model.y_min])
+        self.update_node_status()
+
+    def catch_up_walking(self, step):
+        """Apply the distance updates of all full timesteps walked on the current edge before a step, 
+            which are not applied while walking when using the 'events' engine (see ArrivalScheduler).
+
+            Args:
+                step (int): The step up to which walking is applied
+        """
+        for _ in range(step - self.pending_walk_step):
+            self.stop_walking_after_timestep()
+        self.pending_walk_step = step
+
+    def move_to_location(self):
+        """Move the agent in space to the coordinates of its current location (unless the model runs headless).
+        """
+        if(not self.model.headless):
+            self.space.move_to(self, [self.location['x'] - self.model.x_min, self.location['y'] - self.model.y_min])
     
     def walk(self):
         """Check whether agent reaches next intersection within this timestep and walk until 
@@ -296,9 +325,6 @@ class Pedestrian(ap.Agent):
         """
         nod = (self.total_detour / self.init_shortest_path_length)
         self.update_model_reporters(nod)
-        # if there is an intermediate destination node, remove it from the agent's personal network
-        if(not self.model.p.origin_destination_pairs):
-            self.personal_network.remove_node(self.dest_name)
         
         # for debugging:
         if(self.model.p.destination_log and self.route_counter > 0):
@@ -308,10 +334,11 @@ class Pedestrian(ap.Agent):
         if(self.model.p.assign_new_destinations):
             # assign new destination to walk towards
             self.assign_new_destination()
-            self.space.move_to(self, [self.location['geometry'].x - self.model.x_min, self.location['geometry'].y - self.model.y_min])
+            self.move_to_location()
         else:
             # mark agent as finished and let it stay at its location
             self.finished = True
+            self.model.groups.finish(self)
 
 
     def evaluate_and_choose_path(self):
@@ -323,7 +350,7 @@ class Pedestrian(ap.Agent):
         one_way_street = (1 if next_edge['one_way_reversed'] else 0)
         
         # if there is no alternative street at this node, assume agent just keeps walking
-        if(self.personal_network.nodes[self.metric_path[0]]['degree'] == 2):
+        if(self.street_network.nodes[self.metric_path[0]]['degree'] == 2):
             # no deviation + one way street = non compliance
             if(one_way_street):
                 self.location['non_compliance'] = True
@@ -336,19 +363,27 @@ class Pedestrian(ap.Agent):
         # degree > 2 = intersection of at least two streets
         else:
             # calculate alternative path and detour
-            alt_path, detour = gh.get_alternative_path(self.personal_network, self.metric_path, self.metric_path_length, self.previous_edge, one_way_street, self.id)
-
-            # evaluate whether to reroute or not
-            deviate_from_path = self.rerouting_decision(detour, next_edge, one_way_street, True)
+            edge_id = self.model.edge_state.edge_ids[self.metric_path[0], self.metric_path[1]]
+            max_detour = self.max_detour(edge_id, one_way_street)
+            alt_path, detour = gh.get_alternative_path(self.street_network, self.metric_path, self.metric_path_length, self.previous_edge, one_way_street, self.id, cache=self.model.alt_path_cache, router=self.model.router, max_detour=max_detour, distance_fields=self.model.distance_fields)
+
+            if(alt_path is None):
+                # no alternative path within the maximum detour, agent keeps its path
+                self.keep_path_without_useful_alternative(max_detour, edge_id, one_way_street)
+                deviate_from_path = False
+                is_alt_path_forbidden = False
+            else:
+                # evaluate whether to reroute or not
+                deviate_from_path = self.rerouting_decision(detour, edge_id, one_way_street, True)
 
-            # if alternative route is forbidden, re-evaluate decision to reroute
-            alt_next_edge = movement.get_directed_edge(self.global_graph, alt_path[0],alt_path[1])
-            is_alt_path_forbidden = alt_next_edge['one_way_reversed']
+                # if alternative route is forbidden, re-evaluate decision to reroute
+                alt_next_edge = movement.get_directed_edge(self.global_graph, alt_path[0],alt_path[1])
+                is_alt_path_forbidden = alt_next_edge['one_way_reversed']
             if(is_alt_path_forbidden and deviate_from_path):
                 if(self.model.p.scenario == 'simple_compliance'):
                     deviate_from_path = False
                 else:
-                    deviate_from_path = not(self.rerouting_decision(-detour, alt_next_edge, 1, self.model.p.record_second_opinion_ncps))
+                    deviate_from_path = not(self.rerouting_decision(-detour, self.model.edge_state.edge_ids[alt_path[0], alt_path[1]], 1, self.model.p.record_second_opinion_ncps))
 
             if(deviate_from_path):
                 # deviation + inital was one_way_street = compliance
@@ -381,7 +416,7 @@ class Pedestrian(ap.Agent):
                 self.no_route_change_nodes.append(self.metric_path[0])
 
 
-    def rerouting_decision(self, detour, edge, ows, record_non_comp_prob):
+    def rerouting_decision(self, detour, edge_id, ows, record_non_comp_prob):
         """Evalutes whether agent reroutes or continues on its intended path based on one way street interventions and the detour of the alternative path 
             Decision is returned as boolean.
             Formula F(x1,...,xn) for the chance to comply is:
@@ -389,7 +424,7 @@ class Pedestrian(ap.Agent):
 
         Args:
             detour (float): The detour length the alternative option would result in 
-            edge (_type_): The edge belonging to the next intended street
+            edge_id (int): The id of the edge belonging to the next intended street
             ows (int): Presence of one way street on the next intended street (1 = ows, 0 = no ows)
             record_non_comp_prob (boolean): Whether to record non compliance probability (depends on definition of the term)
 
@@ -401,10 +436,8 @@ class Pedestrian(ap.Agent):
             return True
         else:
             x = self.rng.random()
-            rel_tot_detour = detour / (self.len_traversed + self.metric_path_length)
-            z = self.constant_weight + rel_tot_detour * self.rtd_weight + ows * self.ows_weight + edge['density'] * self.model.p.weight_density
             # compute probability to stay on path (if ows, this equals non-compliance probability)
-            prop_no_deviation = 1 / (1 + math.exp(-z))
+            prop_no_deviation = self.no_deviation_probability(detour, edge_id, ows)
             
             if(ows and record_non_comp_prob):
                 # record compliance and non_compliance probabilities for model output
@@ -421,26 +454,128 @@ class Pedestrian(ap.Agent):
                     print("Non-Compliance, " + str(self.id))
                 return False 
 
+    def no_deviation_probability(self, detour, edge_id, ows):
+        """Returns the probability to stay on the intended path given the detour of the alternative path (see rerouting_decision).
+
+        Args:
+            detour (float): The detour length the alternative option would result in 
+            edge_id (int): The id of the edge belonging to the next intended street
+            ows (int): Presence of one way street on the next intended street (1 = ows, 0 = no ows)
+
+        Returns:
+            float: Probability to stay on the intended path
+        """
+        rel_tot_detour = detour / (self.len_traversed + self.metric_path_length)
+        z = self.constant_weight + rel_tot_detour * self.rtd_weight + ows * self.ows_weight + self.model.edge_state.density[edge_id] * self.model.p.weight_density
+        return 1 / (1 + math.exp(-z))
+
+    def max_detour(self, edge_id, ows):
+        """Returns the maximum detour of alternative paths searched at the current node (model parameter alt_path_max_detour).
+            With 'weights', it is the detour above which the agent stays on its path with a probability of at least 
+            1 - alt_path_detour_tolerance, derived from its weights (see rerouting_decision).
+
+        Args:
+            edge_id (int): The id of the edge belonging to the next intended street
+            ows (int): Presence of one way street on the next intended street (1 = ows, 0 = no ows)
+
+        Returns:
+            float: The maximum detour or None if alternative paths with any detour are searched
+        """
+        max_detour = self.model.p.get('alt_path_max_detour', None)
+        # in simple_compliance scenario agents always comply if ows, regardless of the detour
+        if(max_detour is None or (self.model.p.scenario == 'simple_compliance' and ows == 1)):
+            return None
+        if(max_detour != 'weights'):
+            return max_detour
+        if(self.rtd_weight <= 0):
+            # probability to stay on path does not increase with the detour
+            return None
+        tolerance = self.model.p.get('alt_path_detour_tolerance', 0.001)
+        # smallest z of rerouting_decision with a probability to stay on path of at least 1 - tolerance
+        z = math.log((1 - tolerance) / tolerance)
+        z_without_detour = self.constant_weight + ows * self.ows_weight + self.model.edge_state.density[edge_id] * self.model.p.weight_density
+        return max(0, (z - z_without_detour) / self.rtd_weight * (self.len_traversed + self.metric_path_length))
+
+    def keep_path_without_useful_alternative(self, max_detour, edge_id, ows):
+        """Agent stays on its intended path, as there is no alternative path with a detour of at most max_detour.
+            The random number of the rerouting decision is drawn as well, so that later decisions are not changed. 
+            If ows, the non compliance probability of the maximum detour is recorded, which is a lower bound of the 
+            probability of the (unknown) detour of the alternative path.
+
+        Args:
+            max_detour (float): Maximum detour of the alternative path search
+            edge_id (int): The id of the edge belonging to the next intended street
+            ows (int): Presence of one way street on the next intended street (1 = ows, 0 = no ows)
+        """
+        self.rng.random()
+        self.model.no_useful_alternatives += 1
+        if(ows):
+            prop_no_deviation = self.no_deviation_probability(max_detour, edge_id, ows)
+            self.non_comp_probs.append(prop_no_deviation)
+            self.comp_probs.append(1 - prop_no_deviation)
+
 # ---- UPDATER FUNCTIONS ---- 
     def update_graph_edge_to_next(self):
         """ Update the agents graph edge to edge between first two nodes of its path.
         """
-        self.graph_edge = self.global_graph[self.metric_path[0]][self.metric_path[1]]
-        # self.set_graph_edge(self.metric_path[0], self.metric_path[1])
+        self.graph_edge_id = self.model.edge_state.edge_ids[self.metric_path[0], self.metric_path[1]]
     
     def update_graph_edge_to_final(self):
         """ Update the agents graph edge to edge of the destination location
         """
-        self.graph_edge = self.global_graph[self.dest['nearer_node']][self.dest['remote_node']]
+        if(isinstance(self.dest_node, gh.EdgePoint)):
+            self.graph_edge_id = self.model.edge_state.edge_ids[self.dest_node.nearer_node, self.dest_node.remote_node]
+        else:
+            # destination is a node, reached over the last edge of the path (which differs from the initial one after rerouting)
+            self.graph_edge_id = self.model.edge_state.edge_ids[self.metric_path[0], self.metric_path[1]]
 
     def update_edge_attributes(self):
         """ Update the agents current edge to next edge on path, set remaining distance on edge
             to edge distance and update edge counter.
         """
-        self.current_edge = movement.get_directed_edge(self.personal_network, self.metric_path[0], self.metric_path[1])
+        self.current_edge = self.directed_edge(self.metric_path[0], self.metric_path[1])
         self.remaining_dist_on_edge = self.current_edge['mm_len']
-        gh.increase_edge_counter(self.graph_edge, 1)
+        self.update_node_status()
+        gh.increase_edge_counter(self.model.edge_state, self.graph_edge_id, 1)
+
+    def directed_edge(self, start, end):
+        """ Returns the edge between two consecutive nodes of the path, oriented from start to end (see movement.get_directed_edge).
+            The first edge from an origin on an edge and the last edge to a destination on an edge are the parts of their edges, 
+            which are only cut from the edge geometry when the agent walks on them.
+
+            Args:
+                start: Node or gh.EdgePoint to start walking from
+                end: Node or gh.EdgePoint to walk to
+        """
+        if(isinstance(start, gh.EdgePoint)):
+            return movement.get_directed_edge_part(self.street_network, start, end, True)
+        if(isinstance(end, gh.EdgePoint)):
+            return movement.get_directed_edge_part(self.street_network, end, start, False)
+        return movement.get_directed_edge(self.street_network, start, end)
+
+    def update_node_status(self):
+        """ Update whether the agent is in the model's group of agents on a node (see AgentGroups), 
+            after its remaining distance on the current edge changed.
+        """
+        self.model.groups.update_on_node(self)
+
+
 
+class ArrayPedestrian(Pedestrian):
+    """Pedestrian whose walking state is stored in the model's AgentArrays (model parameter engine='arrays'), 
+        so that the model can let all agents walk at once using array operations (see DistanceKeepingModel.walk_agents).
+    """
+    remaining_dist_on_edge = array_attribute('remaining_dist_on_edge')
+    walking_distance = array_attribute('walking_distance')
+    len_traversed = array_attribute('len_traversed')
+    metric_path_length = array_attribute('metric_path_length')
+    finished = array_attribute('finished')
+
+    def setup(self):
+        """Reserves the index of the agent in the model's AgentArrays and initializes the agent.
+        """
+        self.index = self.model.agent_arrays.add_agent()
+        super().setup()
 
 
 class DistanceKeepingModel(ap.Model):
@@ -450,16 +585,20 @@ class DistanceKeepingModel(ap.Model):
 
         """Create the graph using the street input file. """  
         self.create_graph(streets_gpkg=self.p.streets_path)
+        # Paths between predefined origin-destination pairs, computed once and copied by the agents
+        if(self.p.origin_destination_pairs):
+            self.od_routes = self.compute_od_routes(self.p.origin_destination_pairs)
+        else:
+            self.od_routes = None
         
         """Initialize model variables. """  
         # Create lists for position and edge data and compliance counter 
-        self.position_list = []
         self.node_list = []
-        self.edge_gdf = []
         self.compliances = 0
         self.non_compliances = 0
         self.random_reroutings = 0
         self.no_route_changes = 0
+        self.no_useful_alternatives = 0
         self.step_counter = 0
         # Normalized observed detours
         self.NODs = []
@@ -485,11 +624,64 @@ class DistanceKeepingModel(ap.Model):
         self.height = math.ceil(self.y_max - self.y_min)
 
         """Create a list of agents. """ 
-        self.agents = ap.AgentList(self, self.p.agents, Pedestrian)
-
-        self.space = ap.Space(self, shape=[self.width, self.height])
-        self.space.add_agents(self.agents, self.agents.init_pos)
-        self.agents.setup_pos(self.space)
+        # Choose engine: 'agents' keeps the walking state in the agent objects and lets every agent walk on its own,
+        # 'arrays' keeps it in arrays owned by the model and lets all agents walk at once, 
+        # 'events' only processes agents in steps in which they reach a node (same results for a given seed)
+        self.engine = self.p.get('engine', 'agents')
+        if(self.engine == 'arrays'):
+            self.agent_arrays = AgentArrays(self.p.agents)
+            self.agents = ap.AgentList(self, self.p.agents, ArrayPedestrian)
+        elif(self.engine in ('agents', 'events')):
+            self.agents = ap.AgentList(self, self.p.agents, Pedestrian)
+        else:
+            raise ValueError("Unknown engine '%s', choose 'agents', 'arrays' or 'events'." % self.engine)
+        # Groups of agents selected in each step, updated by the agents when their state changes
+        self.groups = AgentGroups(self, self.agents)
+        # Draw origins and destinations of all agents at once, then compute the first routes
+        self.assign_random_ods(self.agents, False)
+        self.agents.init_route()
+        if(self.engine == 'events'):
+            self.scheduler = ArrivalScheduler()
+            for agent in self.agents:
+                self.scheduler.schedule(agent, self.step_counter)
+
+        # File format of spatial outputs
+        self.output_format = self.p.get('output_format', 'gpkg')
+        if(self.output_format not in soc.OUTPUT_FORMATS):
+            raise ValueError("Unknown output format '%s', choose one of %s." % (self.output_format, ", ".join(soc.OUTPUT_FORMATS)))
+
+        # Create a space holding the agent positions for animation, unless the model runs headless
+        self.headless = self.p.get('headless', False)
+        if(not self.headless):
+            self.space = ap.Space(self, shape=[self.width, self.height])
+            self.space.add_agents(self.agents, self.agents.init_pos)
+            self.agents.setup_pos(self.space)
+
+        """Create recorders of outputs over time. """
+        # Recorded outputs are written to disk every output_flush_interval timesteps (None: only at the end of the run) 
+        # and whenever the recorded data kept in memory exceeds output_memory_budget megabytes
+        run_id = self._run_id if self._run_id is not None else ["X", "X"]
+        output_path = "./Experiment/output/%s/%%s_%s_%s.npy" % (self.p.out_name, run_id[0], run_id[1])
+        self.output_flush_interval = self.p.get('output_flush_interval', None)
+        self.output_memory_budget = self.p.get('output_memory_budget', 1000) * 1e6
+        self.recorders = []
+        # People counters and densities of the edges in every timestep
+        if(self.p.edges):
+            self.edge_time_series = EdgeTimeSeries(self.edge_state, output_path % "edges")
+            self.recorders.append(self.edge_time_series)
+        # Locations of all agents (or of the agents with ids in positions_agents) every positions_interval timesteps
+        if(self.p.positions):
+            recorded_ids = self.p.get('positions_agents', None)
+            if(recorded_ids is None):
+                recorded = self.agents
+            else:
+                recorded_ids = set(recorded_ids)
+                recorded = self.agents.select([agent.id in recorded_ids for agent in self.agents])
+            positions_writer = soc.PositionsWriter("./Experiment/output/%s/positions_%s_%s" % (self.p.out_name, run_id[0], run_id[1]), 
+                                                   self.p.duration, self.output_format)
+            self.trajectories = TrajectoryRecorder(recorded, positions_writer, 
+                                                   self.p.get('positions_interval', 1), self.p.get('positions_buffer_size', 1000000))
+            self.recorders.append(self.trajectories)
 
                     
     def step(self):
@@ -498,8 +690,11 @@ class DistanceKeepingModel(ap.Model):
         
         """ Select different groups of agents. """ 
         # Select agents that are on intersections
-        not_finished = self.agents.select(self.agents.finished == False)
-        on_node = not_finished.select(not_finished.remaining_dist_on_edge == 0)
+        if(self.engine == 'events'):
+            on_node = ap.AgentList(self, self.scheduler.pop(self.step_counter, ArrivalScheduler.NODE))
+            on_node.catch_up_walking(self.step_counter)
+        else:
+            on_node = self.groups.select_on_node()
         on_path_node = on_node.select(ap.AttrIter(list((map(len, on_node.metric_path)))) != 2)
         on_penultimate_node = on_node.select(ap.AttrIter(list((map(len, on_node.metric_path)))) == 2)
         
@@ -516,58 +711,154 @@ class DistanceKeepingModel(ap.Model):
 
         """ Movement of agents. """ 
         # let all agents walk for duration of one timestep or until next intersection is reached
-        not_finished.walk()
+        if(self.engine == 'arrays'):
+            self.walk_agents()
+        elif(self.engine == 'events'):
+            # only agents reaching the next node walk now, all other agents walk when needed
+            for agent in on_node:
+                self.scheduler.schedule(agent, self.step_counter, node_checked=True)
+            arrived = ap.AgentList(self, self.scheduler.pop(self.step_counter, ArrivalScheduler.ARRIVAL))
+            arrived.catch_up_walking(self.step_counter)
+            arrived.stop_walking_at_node()
+        else:
+            not_finished = self.groups.not_finished()
+            on_edge = not_finished.select([agent.walking_distance <= agent.remaining_dist_on_edge for agent in not_finished])
+            not_finished.walk()
+            self.update_locations_on_edges(on_edge)
 
         """ Update reporters for agent who reached their destination in this timestep. """ 
         # select agents thats have reached destination and calculate route statistics
-        at_final_node = not_finished.select(ap.AttrIter(list((map(len, not_finished.metric_path)))) == 1)
+        # (only agents which stopped at a node in this timestep can have reached their destination)
+        arrived = self.groups.pop_arrived()
+        at_final_node = arrived.select(ap.AttrIter(list((map(len, arrived.metric_path)))) == 1)
+        if(self.p.assign_new_destinations):
+            self.assign_random_ods(at_final_node, self.p.reuse_previous_dest_as_orig)
         at_final_node.finish_route_and_calc_statistics()
 
+        if(self.engine == 'events'):
+            # schedule agents on their new route or on the node they reached
+            final_ids = set(at_final_node.id)
+            for agent in arrived:
+                if(agent.id in final_ids):
+                    if(not agent.finished):
+                        self.scheduler.schedule(agent, self.step_counter + 1)
+                else:
+                    self.scheduler.schedule_node(agent, self.step_counter + 1)
+
         self.step_counter += 1
 
+    def assign_random_ods(self, agents, keep_prev_dest_as_orig):
+        """Draws random origin-destination pairs for a group of agents at once and passes them to the agents, 
+            which use them for their next call of assign_random_od. Pairs are drawn from the random generator 
+            of each agent and equal the pairs the agents would draw themselves.
+
+            Args:
+                agents (ap.AgentList): Agents to draw origins and destinations for
+                keep_prev_dest_as_orig (boolean): whether to keep the destination of the previous 
+                    route as origin for the following route or to create new origin
+        """
+        if(self.p.origin_destination_pairs or len(agents) == 0):
+            return
+        origins = [agent.dest.copy() for agent in agents] if keep_prev_dest_as_orig else None
+        origins, destinations = self.edge_sampler.random_od_pairs(list(agents.randomDestinationGenerator), 250, origins)
+        for agent, orig, dest in zip(agents, origins, destinations):
+            agent.pending_od = (orig, dest)
+
+    def walk_agents(self):
+        """Array version of Pedestrian.walk for all agents that have not finished (engine 'arrays'). 
+            Agents reaching the next intersection stop there, all other agents walk on their edge using array operations.
+        """
+        at_node, on_edge = self.agent_arrays.walking_beyond_next_node(~self.agent_arrays.finished)
+        self.agents_at(at_node).stop_walking_at_node()
+        self.agent_arrays.walk_full_timestep(on_edge)
+        # agents that walked exactly until the next node are on that node in the next step
+        self.agents_at(on_edge & (self.agent_arrays.remaining_dist_on_edge == 0)).update_node_status()
+        self.update_locations_on_edges(self.agents_at(on_edge))
+
+    def agents_at(self, mask):
+        """Returns the agents at the indices of a boolean mask over the model's AgentArrays (engine 'arrays').
+
+            Args:
+                mask (numpy.ndarray): Boolean mask of agents
+
+            Returns:
+                ap.AgentList: Agents in order of their creation
+        """
+        return ap.AgentList(self, [self.agents[index] for index in np.flatnonzero(mask)])
+
+    def update_walking_agents(self):
+        """Apply the walking of all full timesteps up to the current step to all agents walking on an edge and
+            update their location (engine 'events').
+        """
+        walking = ap.AgentList(self, self.scheduler.agents_walking_in(self.step_counter - 1))
+        walking.catch_up_walking(self.step_counter)
+        self.update_locations_on_edges(walking)
+
+    def update_locations_on_edges(self, agents):
+        """Compute the location of agents walking on their current edge from the remaining distance to the next node, 
+            for all agents at once (see movement.interpolate_on_edges).
+
+            Args:
+                agents (ap.AgentList): Agents that walked on their current edge for the full timestep
+        """
+        if(len(agents) == 0):
+            return
+        edges = list(agents.current_edge)
+        distance = np.array([edge['mm_len'] for edge in edges]) - np.array(list(agents.remaining_dist_on_edge))
+        x, y = movement.interpolate_on_edges(edges, distance, self.edge_sampler)
+        for agent, agent_x, agent_y in zip(agents, x.tolist(), y.tolist()):
+            agent.location['x'] = agent_x
+            agent.location['y'] = agent_y
+            agent.move_to_location()
+
     def update(self):
-        # update edge pedestrian counter attributes
-        ppl_count = Counter(nx.get_edge_attributes(self.model.G, "ppl_count"))
-        temp_count = Counter(nx.get_edge_attributes(self.model.G, "temp_ppl_increase"))
-        length = nx.get_edge_attributes(self.model.G, "mm_len")
-        width = nx.get_edge_attributes(self.model.G, "sidewalk_width")
-        density = dict(Counter({key : ppl_count[key] / (length[key] * width[key]) for key in ppl_count}))
-        ppl_count.update(temp_count)
-        ppl_count=dict(ppl_count)
-        self.max_density = {k:max(density.get(k,float('-inf')), self.max_density.get(k, float('-inf'))) for k in density.keys()}
-        nx.set_edge_attributes(self.model.G, ppl_count, "ppl_count")
-        nx.set_edge_attributes(self.model.G, density, "density")
-        nx.set_edge_attributes(self.model.G, 0, "temp_ppl_increase")
+        # update edge pedestrian counters, densities and maximum densities
+        self.edge_state.update()
 
         """ Record a dynamic variable. """
         self.model.record('non_compliances')
         self.model.record('compliances')
-        
-        # update fake date for temporal viz in qgis
-        time = datetime.datetime(2000, 1, 1, self.step_counter * self.p.duration // 3600, (self.step_counter * self.p.duration // 60) % 60 , self.step_counter * self.p.duration % 60)
+
+        # locations of agents walking on edges are only computed when they are needed (engine 'events')
+        if(self.engine == 'events' and (self.p.positions or not self.headless)):
+            self.update_walking_agents()
         
         if(self.p.positions):
-        # store all the agents current location in list and add time and counter attributes
-            positions = self.agents.location.copy()
-            for agent_position in positions:
-                agent_position['time']= time
-                agent_position['counter']= self.step_counter
-                self.position_list.append(agent_position)
-
-        # store edge information in dataframe
-        nx.set_edge_attributes(self.model.G, self.step_counter, "counter")
-        nx.set_edge_attributes(self.model.G, time, "time")
+            # store the current location of the recorded agents
+            self.trajectories.record(self.step_counter)
 
         if(self.p.edges):
-            edges = momepy.nx_to_gdf(self.model.G, points=False)
-            self.edge_gdf.append(edges)
+            # store people counters and densities of all edges
+            self.edge_time_series.record()
+
+        # write recorded outputs to disk
+        if((self.output_flush_interval and self.step_counter % self.output_flush_interval == 0) or 
+           sum(recorder.nbytes for recorder in self.recorders) > self.output_memory_budget):
+            for recorder in self.recorders:
+                recorder.flush()
 
         # if all agents finished their routes -> end model run. 
         # Event can only occur if model parameter "assign_new_destinations" == False
-        if(len(self.agents.select(self.agents.finished == True)) == self.p.agents):
+        if(self.groups.finished_count == self.p.agents):
             self.model.stop()
 
+    def fake_time(self):
+        """Returns a fake date for the current timestep for temporal visualization in qgis. """
+        return soc.fake_time(self.step_counter, self.p.duration)
+
+    def edge_attributes_to_graph(self):
+        """Write people counters, densities and the current timestep from the edge state to the edges of the graph, 
+            so that they are contained in edge outputs.
+        """
+        self.edge_state.to_graph(self.G)
+        nx.set_edge_attributes(self.G, self.step_counter, "counter")
+        nx.set_edge_attributes(self.G, self.fake_time(), "time")
+
     def end(self):
+        if(self.engine == 'events'):
+            # bring the state of all agents walking on edges up to date
+            self.update_walking_agents()
+
         """ Compute evaluation measures (means, standard deviations, variances). """
         self.mean_nod = np.mean(self.NODs)
         self.std_nod = np.std(self.NODs)
@@ -585,7 +876,29 @@ class DistanceKeepingModel(ap.Model):
             self.var_non_comp_prob = None
             self.mean_comp_prob = None
             self.std_comp_prob = None
-
+        # usage of the alternative path cache
+        if self.alt_path_cache is not None:
+            self.alt_path_cache_hits = self.alt_path_cache.hits
+            self.alt_path_cache_misses = self.alt_path_cache.misses
+        else:
+            self.alt_path_cache_hits = 0
+            self.alt_path_cache_misses = 0
+        # usage of the distance fields (expansions are nodes searched beyond the neighbors of the current node)
+        if self.distance_fields is not None:
+            self.distance_field_hits = self.distance_fields.hits
+            self.distance_field_misses = self.distance_fields.misses
+            self.distance_field_expansions = self.distance_fields.expansions
+        else:
+            self.distance_field_hits = 0
+            self.distance_field_misses = 0
+            self.distance_field_expansions = 0
+        # number of path searches and nodes expanded by them (only counted by the CSR routing backend)
+        if self.router is not None:
+            self.path_searches = self.router.searches
+            self.node_expansions = self.router.expansions
+        else:
+            self.path_searches = 0
+            self.node_expansions = 0
 
         """ Report an evaluation measure. """
         self.report('mean_nod')
@@ -602,6 +915,10 @@ class DistanceKeepingModel(ap.Model):
         self.report('NODs')
         self.report('non_comp_probs')
         self.report('comp_probs')
+        self.report(['alt_path_cache_hits', 'alt_path_cache_misses'])
+        self.report(['distance_field_hits', 'distance_field_misses', 'distance_field_expansions'])
+        self.report(['path_searches', 'node_expansions'])
+        self.report('no_useful_alternatives')
 
         """ Produce spatial output files. """
         # create output directory
@@ -609,18 +926,24 @@ class DistanceKeepingModel(ap.Model):
         # If not an Experiment set self._run_id object (sampleID and iteration in experiments)
         if(self._run_id == None):
             self._run_id = ["X","X"]
+        # write time in seconds and file size in bytes of each output
+        output_writes = {}
         if(self.p.max_densities):
             # output density maximum per street
-            soc.save_maximum_densities_to_file(self.G, self.max_density, self.p.out_name, self._run_id[0], self._run_id[1])    
+            self.edge_attributes_to_graph()
+            output_writes['max_densities'] = soc.save_maximum_densities_to_file(self.G, self.edge_state.as_dict('max_density'), self.p.out_name, self._run_id[0], self._run_id[1], self.output_format)    
         if(self.p.positions):
-            # output position data as gpkg
-            soc.save_positions_to_file(self.position_list, self.p.out_name, self._run_id[0], self._run_id[1])
+            # complete position data as gpkg or GeoParquet, written in blocks during the run
+            output_writes['positions'] = self.trajectories.save()
         if(self.p.edges):
-            # output edge data as gpkg
-            soc.save_edges_to_file(self.edge_gdf, self.p.out_name, self._run_id[0], self._run_id[1])
+            # output edge data as npy (time series) and gpkg or GeoParquet (geometries), see soc.convert_edges_to_gpkg
+            output_writes['edges'] = soc.save_edges_to_file(self.edge_time_series, self.G, self.p.out_name, self._run_id[0], self._run_id[1], self.output_format)
         if(self.p.compliance_nodes):
-            # output compliance nodes as gpkg
-            soc.save_compliance_nodes_to_file(self.nodes, self.p.out_name, self._run_id[0], self._run_id[1])
+            # output compliance nodes as gpkg or GeoParquet
+            output_writes['compliance_nodes'] = soc.save_compliance_nodes_to_file(self.nodes, self.p.out_name, self._run_id[0], self._run_id[1], self.output_format)
+        self.output_write_seconds = sum(seconds for seconds, _ in output_writes.values())
+        self.output_bytes = sum(size for _, size in output_writes.values())
+        self.report(['output_write_seconds', 'output_bytes'])
         if(self.p.destination_log):
             for agent in self.agents:
                 self.destination_list.append(agent.destination_dict) # just for bugfixing
@@ -633,6 +956,8 @@ class DistanceKeepingModel(ap.Model):
             print(f" absolute non-compliance-probabilities: {len(self.non_comp_probs)}")
             print(f" absolute compliance-probabilities: {len(self.comp_probs)}")
             print(f" absolute NODs: {len(self.NODs)}")
+            for output, (seconds, size) in output_writes.items():
+                print(f" {output} ({self.output_format}): written in {seconds:.2f} s, {size / 1e6:.1f} MB")
 
             
     def create_graph(self, streets_gpkg):
@@ -641,6 +966,139 @@ class DistanceKeepingModel(ap.Model):
         Args:
             streets_gpkg (str): Path to gpkg linestring file
         """
+        # Prepare the street graph, or load it from the cache of prepared graphs (graph_cache_dir None disables the cache)
+        self.graph_cache_dir = self.p.get('graph_cache_dir', './Experiment/cache')
+        if(self.graph_cache_dir):
+            self.graph_cache_key = gh.graph_cache_key(streets_gpkg, self.p.scenario)
+            self.G, self.nodes, self.edges = gh.load_cached_graph(self.graph_cache_dir, self.graph_cache_key, lambda: self.read_graph(streets_gpkg))
+        else:
+            self.G, self.nodes, self.edges = self.read_graph(streets_gpkg)
+        # Nodes by coordinate, to find the nodes of randomly chosen edges
+        self.node_index = movement.NodeIndex(self.G, self.p.get('node_coord_tolerance', None))
+        # Random points on the edges, e.g. for origins and destinations of agents
+        self.edge_sampler = movement.EdgeSampler(self.edges, self.node_index, self.static_arrays('edge_sampler', lambda: movement.EdgeSampler.static_arrays(self.edges)))
+        # self.G = nx.convert_node_labels_to_integers(self.G, first_label=0, ordering='default', label_attribute="pos")
+        nx.set_edge_attributes(self.G, 0, "ppl_count")
+        nx.set_edge_attributes(self.G, 0, "temp_ppl_increase")
+        nx.set_edge_attributes(self.G, 0, "ppl_total")
+        nx.set_edge_attributes(self.G, 0, "density")
+        nx.set_edge_attributes(self.G, 0, "max_density")
+        # People counters and densities of the edges, updated each timestep
+        self.edge_state = gh.EdgeState(self.G, self.static_arrays('edge_state', lambda: gh.EdgeState.static_arrays(self.G)))
+        # Undirected street network used for routing, shared by all agents
+        self.base_network = nx.freeze(self.G.to_undirected())
+        # Both orientations of all edges, shared by graph and base network (see movement.get_directed_edge)
+        movement.add_directed_edges(self.base_network)
+        self.G.graph['directed_edges'] = self.base_network.graph['directed_edges']
+        # positions on the edges are interpolated on the arrays of the edge sampler (see movement.interpolate_on_edges)
+        self.edge_sampler.index_directed_edges(self.base_network.graph['directed_edges'])
+        # Street network as CSR arrays for path searches without networkx (computed once per street network)
+        self.routing_backend = self.p.get('routing_backend', 'networkx')
+        routing_algorithm = self.p.get('routing_algorithm', 'dijkstra')
+        if(self.routing_backend == 'csr'):
+            if(self.graph_cache_dir):
+                csr_router = routing.get_csr_router(self.base_network, self.graph_cache_key, self.graph_cache_dir)
+            else:
+                csr_router = routing.get_csr_router(self.base_network, streets_gpkg)
+            self.router = routing.PathSearch(csr_router, routing_algorithm)
+        elif(self.routing_backend == 'networkx'):
+            if(routing_algorithm != 'dijkstra'):
+                raise ValueError("Routing algorithm '%s' requires routing backend 'csr'." % routing_algorithm)
+            self.router = None
+        else:
+            raise ValueError("Unknown routing backend '%s', choose 'networkx' or 'csr'." % self.routing_backend)
+        # Shortest paths between all intersections for initial routing (computed once per street network)
+        if(self.p.get('precomputed_routing', True)):
+            if(self.graph_cache_dir):
+                self.routing_table = routing.get_routing_table(self.base_network, self.graph_cache_key, self.graph_cache_dir)
+            else:
+                self.routing_table = routing.get_routing_table(self.base_network, streets_gpkg)
+        else:
+            self.routing_table = None
+        # Alternative paths around blocked edges, shared by all agents (size 0 disables the cache)
+        alt_path_cache_size = self.p.get('alt_path_cache_size', 10000)
+        if(alt_path_cache_size > 0):
+            self.alt_path_cache = gh.AlternativePathCache(self.base_network, alt_path_cache_size, self.router)
+        else:
+            self.alt_path_cache = None
+        # Distances of all nodes to destinations of agents for alternative paths, shared by all agents (size 0 disables them)
+        distance_field_cache_size = self.p.get('distance_field_cache_size', 0)
+        if(distance_field_cache_size > 0):
+            self.distance_fields = routing.DistanceFieldCache(self.base_network, distance_field_cache_size, self.routing_table)
+        else:
+            self.distance_fields = None
+
+    def shortest_path(self, network, orig, dest):
+        """Returns the shortest path between two nodes of the street network and its length, resolved from 
+            the routing table or searched with the routing backend of the model. Origin and destination may be 
+            on edges of the street network (see gh.EdgePoint).
+
+        Args:
+            network (nx.Graph): Street network
+            orig: Origin node or gh.EdgePoint
+            dest: Destination node or gh.EdgePoint
+
+        Returns:
+            list, float: The path and its length
+        """
+        if(self.routing_table is not None):
+            # resolve shortest path from precomputed distances between intersections
+            path = self.routing_table.shortest_path(orig, dest)
+            if(self.router is not None):
+                return path, self.router.path_weight(network, path)
+            return path, gh.path_weight(network, path)
+        if(self.router is not None):
+            return self.router.shortest_path(network, orig, dest)
+        network = gh.endpoint_network(network, orig, dest)
+        path = nx.dijkstra_path(network, source=orig, target=dest, weight='mm_len')
+        return path, nx.path_weight(network, path, weight='mm_len')
+
+    def compute_od_routes(self, od_pairs):
+        """Computes the shortest path between origin and destination of each origin-destination pair once,
+            so that agents do not search the path for each of their routes.
+
+        Args:
+            od_pairs (tuple): Tuple of OD-Tuples
+
+        Returns:
+            dict: Path (tuple of nodes) and its length by OD-Tuple
+        """
+        od_routes = {}
+        for orig, dest in od_pairs:
+            if((orig, dest) in od_routes):
+                continue
+            if(orig == dest):
+                raise ValueError("Origin and destination of origin-destination pair (%s, %s) are the same node." % (orig, dest))
+            path, length = self.shortest_path(self.base_network, orig, dest)
+            od_routes[orig, dest] = (tuple(path), length)
+        return od_routes
+
+    def static_arrays(self, name, compute):
+        """Returns read-only arrays of the street network, memory-mapped from the cache of prepared graphs and shared 
+            by all model runs, also by parallel processes of an experiment (see gh.load_cached_arrays). 
+            Returns None without cache, so that the arrays are computed for this model run.
+
+        Args:
+            name (str): Name of the arrays
+            compute (function): Function without arguments computing the arrays as dict
+
+        Returns:
+            dict: The arrays or None
+        """
+        if(self.graph_cache_dir):
+            return gh.load_cached_arrays(self.graph_cache_dir, '%s_%s' % (name, self.graph_cache_key), compute)
+        return None
+
+    def read_graph(self, streets_gpkg):
+        """Reads the street network from a gpkg linestring file and prepares the network graph and
+            GeoDataFrames of its nodes and edges for the scenario of the model. 
+
+        Args:
+            streets_gpkg (str): Path to gpkg linestring file
+
+        Returns:
+            nx.Graph, geopandas.GeoDataFrame, geopandas.GeoDataFrame: Graph, nodes and edges
+        """
         # Read street network as geopackage and convert it to GeoDataFrame
         streets: geopandas.GeoDataFrame = geopandas.read_file(streets_gpkg)
         # if one way street information is missing, assume there is no one way street
@@ -655,35 +1113,27 @@ class DistanceKeepingModel(ap.Model):
         streets.loc[mask_path, 'sidewalk_width'] = 3
         streets.loc[mask_living, 'sidewalk_width'] = 10
         # Transform GeoDataFrame to networkx Graph
-        self.G = momepy.gdf_to_nx(streets, approach='primal', multigraph=False)        
+        G = momepy.gdf_to_nx(streets, approach='primal', multigraph=False)        
         # Calculate degree of nodes
-        self.G = momepy.node_degree(self.G, name='degree')
-        # self.G2 = momepy.node_degree(self.G2, name='degree')
+        G = momepy.node_degree(G, name='degree')
+        # G2 = momepy.node_degree(G2, name='degree')
         if(self.p.scenario == "no_interventions"):
-            nx.set_edge_attributes(self.G, False, "one_way_reversed")
-            nx.set_edge_attributes(self.G, False, "one_way")
+            nx.set_edge_attributes(G, False, "one_way_reversed")
+            nx.set_edge_attributes(G, False, "one_way")
         # Convert graph back to GeoDataFrames with nodes and edges
-        self.nodes, self.edges, sw = momepy.nx_to_gdf(self.G, points=True, lines=True, spatial_weights=True)
-        # self.nodes2, self.edges2, sw = momepy.nx_to_gdf(self.G2, points=True, lines=True, spatial_weights=True)
-        self.nodes['y']=self.nodes['geometry'].y
-        self.nodes['xy']=list(zip(self.nodes['geometry'].x, self.nodes['geometry'].y))
-        pos=pd.Series(self.nodes.xy.values,index=self.nodes.nodeID).to_dict()
+        nodes, edges, sw = momepy.nx_to_gdf(G, points=True, lines=True, spatial_weights=True)
+        # nodes2, edges2, sw = momepy.nx_to_gdf(G2, points=True, lines=True, spatial_weights=True)
+        nodes['y']=nodes['geometry'].y
+        nodes['xy']=list(zip(nodes['geometry'].x, nodes['geometry'].y))
+        pos=pd.Series(nodes.xy.values,index=nodes.nodeID).to_dict()
         # set index column, and rename nodes in graph
-        self.nodes = self.nodes.set_index("nodeID", drop=False)
-        self.nodes = self.nodes.rename_axis([None])
-        self.nodes['compliances'] = 0
-        self.nodes['non_compliances'] = 0
-        self.nodes['random_reroutings'] = 0
-        self.nodes['no_route_changes'] = 0
-        pos_inv=pd.Series(self.nodes.nodeID.values,index=self.nodes.xy).to_dict()
-        self.G = nx.relabel_nodes(self.G, pos_inv)
-        nx.set_node_attributes(self.G, pos, "pos")
-        # self.G = nx.convert_node_labels_to_integers(self.G, first_label=0, ordering='default', label_attribute="pos")
-        nx.set_edge_attributes(self.G, 0, "ppl_count")
-        nx.set_edge_attributes(self.G, 0, "temp_ppl_increase")
-        nx.set_edge_attributes(self.G, 0, "ppl_total")
-        nx.set_edge_attributes(self.G, 0, "density")
-        density = nx.get_edge_attributes(self.G, "density")
-        self.max_density = density
-        nx.set_edge_attributes(self.G, 0, "max_density")
-
+        nodes = nodes.set_index("nodeID", drop=False)
+        nodes = nodes.rename_axis([None])
+        nodes['compliances'] = 0
+        nodes['non_compliances'] = 0
+        nodes['random_reroutings'] = 0
+        nodes['no_route_changes'] = 0
+        pos_inv=pd.Series(nodes.nodeID.values,index=nodes.xy).to_dict()
+        G = nx.relabel_nodes(G, pos_inv)
+        nx.set_node_attributes(G, pos, "pos")
+        return G, nodes, edges
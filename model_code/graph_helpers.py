@@ -1,35 +1,205 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
 import networkx as nx
+import numpy as np
 import movement
-from shapely.ops import substring, Point, LineString
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
 
 
-# TODO: FIX initial position bug 
-def add_temporary_node(graph: nx.Graph, edge_start, edge_end, split_dist, name, x, y):
-        """Adds a temporary node to a given graph.
-        
-        Args: 
-            graph (nx.Graph): Graph to add node to
-            edge_start: starting node of edge on which new node will be placed
-            edge_end: ending node of edge on which new node will be placed
-            split_dist: distance from starting node along edge at which new node shall be placed 
-            name: name of new node
-            x: x-coordinate of new node
-            y: y-coordinate of new node
-        """
-
-        edge = movement.get_directed_edge(graph, edge_start, edge_end)
-        near_to_exact = substring(edge['geometry'], start_dist=0, end_dist=split_dist)
-        near_to_exact = LineString(list(near_to_exact.coords)[::-1])
-        exact_to_remote = substring(edge['geometry'], start_dist=split_dist, end_dist=edge['geometry'].length)
-        graph.add_node(name, pos=(x,y), nodeID='name', degree=2)
-        graph.add_edge(name,edge_start, mm_len=split_dist, 
-                    geometry=near_to_exact, ID=str(name+"_1"), one_way = not edge['one_way'],
-                    one_way_reversed = not edge['one_way_reversed'], highway = edge['highway'],
-                    sidewalk_width = edge['sidewalk_width'])
-        graph.add_edge(name, edge_end, mm_len=(edge['geometry'].length - split_dist),
-                    geometry=exact_to_remote, ID=str(name+"_2"), one_way=edge['one_way'],
-                    one_way_reversed=edge['one_way_reversed'], highway = edge['highway'],
-                    sidewalk_width = edge['sidewalk_width'])
+# --- Virtual Endpoints (origins and destinations on edges) ------
+
+class EdgePoint(namedtuple('EdgePoint', ['name', 'nearer_node', 'remote_node', 'dist_from_nearer', 'dist_from_remote', 'pos'])):
+        """ Origin or destination of an agent on an edge of the street network, used as first or last node of its path 
+            (virtual endpoint). It is connected to both nodes of its edge by the parts of the edge on either side of it, 
+            with the distances along the edge as lengths, but it is never added to the graph: path searches start or end 
+            at the nodes of the edge with these distances as offsets (see routing.RoutingTable and routing.CsrRouter). 
+            The geometry of a part is only computed when an agent walks on it (see movement.get_directed_edge_part).
+
+        Args:
+            name (str): Name of the point, used as node label in outputs
+            nearer_node: Nearer node of the edge
+            remote_node: Remote node of the edge
+            dist_from_nearer (float): Distance along the edge to the nearer node
+            dist_from_remote (float): Distance along the edge to the remote node
+            pos (tuple): Coordinates of the point
+        """
+        __slots__ = ()
+
+        def endpoints(self):
+                """ Returns the nodes of the edge (nearer node first) and the distances to them.
+                """
+                return [(self.nearer_node, self.dist_from_nearer), (self.remote_node, self.dist_from_remote)]
+
+        def dist_to(self, node):
+                """ Returns the distance along the edge to one of its nodes.
+
+                Args:
+                    node: Nearer or remote node of the edge
+                """
+                if node == self.nearer_node:
+                        return self.dist_from_nearer
+                if node == self.remote_node:
+                        return self.dist_from_remote
+                raise KeyError("Node %s is not a node of the edge of %s." % (node, self.name))
+
+
+def edge_point(graph, point, name):
+        """ Returns an origin or destination on an edge as EdgePoint.
+
+        Args:
+            graph (nx.Graph): Street network containing the edge
+            point (dict): Point as returned by movement.generate_random_point_on_line
+            name (str): Name of the point
+
+        Returns:
+            EdgePoint: The point
+        """
+        edge = movement.get_directed_edge(graph, point['nearer_node'], point['remote_node'])
+        return EdgePoint(name, point['nearer_node'], point['remote_node'], point['dist_from_nearer'],
+                         edge['geometry'].length - point['dist_from_nearer'], (point['point'].x, point['point'].y))
+
+def node_name(node):
+        """ Returns the name of a node of a path, which is the node itself for nodes of the street network.
+
+        Args:
+            node: Node of the street network or EdgePoint
+        """
+        return node.name if isinstance(node, EdgePoint) else node
+
+def node_pos(network, node):
+        """ Returns the coordinates of a node of a path.
+
+        Args:
+            network (nx.Graph): Street network
+            node: Node of the street network or EdgePoint
+        """
+        return node.pos if isinstance(node, EdgePoint) else network.nodes[node]['pos']
+
+def path_weight(network, path, weight='mm_len'):
+        """ Returns the length of a path, whose first and last node may be EdgePoints. 
+            Summed from its first to its last edge, same result as nx.path_weight.
+
+        Args:
+            network (nx.Graph): Street network
+            path (list): Nodes of the path
+            weight (str): Edge attribute used as edge length
+        """
+        length = 0
+        for u, v in zip(path[:-1], path[1:]):
+                if isinstance(u, EdgePoint):
+                        length += u.dist_to(v)
+                elif isinstance(v, EdgePoint):
+                        length += v.dist_to(u)
+                else:
+                        length += network[u][v][weight]
+        return length
+
+
+class _OverlayAtlas(Mapping):
+        """ Read-only mapping over a base dict and an overlay dict with disjoint keys.
+            Keys of the base dict are iterated first, followed by the keys of the overlay dict.
+        """
+        __slots__ = ('_base', '_overlay')
+
+        def __init__(self, base, overlay):
+                self._base = base
+                self._overlay = overlay
+
+        def __getitem__(self, key):
+                try:
+                        return self._base[key]
+                except KeyError:
+                        return self._overlay[key]
+
+        def __contains__(self, key):
+                return key in self._base or key in self._overlay
+
+        def __iter__(self):
+                yield from self._base
+                yield from self._overlay
+
+        def __len__(self):
+                return len(self._base) + len(self._overlay)
+
+
+class _OverlayAdjacency(Mapping):
+        """ Read-only adjacency mapping combining the adjacency of a base graph with the adjacency of an overlay.
+            Base nodes without overlay edges return the base neighbor dict itself, so lookups of nodes 
+            that are not touched by the overlay cost no more than on the base graph.
+        """
+        __slots__ = ('_base', '_overlay_adj', '_overlay_node')
+
+        def __init__(self, base_adj, overlay_adj, overlay_node):
+                self._base = base_adj
+                self._overlay_adj = overlay_adj
+                self._overlay_node = overlay_node
+
+        def __getitem__(self, node):
+                extra = self._overlay_adj.get(node)
+                if extra is None:
+                        return self._base[node]
+                if node in self._overlay_node:
+                        return extra
+                return _OverlayAtlas(self._base[node], extra)
+
+        def __contains__(self, node):
+                return node in self._base or node in self._overlay_node
+
+        def __iter__(self):
+                yield from self._base
+                yield from self._overlay_node
+
+        def __len__(self):
+                return len(self._base) + len(self._overlay_node)
+
+
+class EndpointNetwork(nx.Graph):
+        """ Read-only view of the street network with the EdgePoints of a path search added as nodes, for path searches 
+            with networkx, which require all nodes of a path to be nodes of the graph. The points and their edges are held 
+            in a small overlay, the street network (base) is not modified and no edge geometry is split.
+            
+            Reading the graph sees base and overlay as one graph, with the same node and neighbor order as a copy 
+            of the base graph with the points added to it in the given order.
+
+        Args:
+            base (nx.Graph): Undirected street network
+            points (list): EdgePoints to add
+            weight (str): Edge attribute used as edge length
+        """
+
+        def __init__(self, base=None, points=(), weight='mm_len'):
+                super().__init__()
+                self._overlay_node = {}
+                self._overlay_adj = {}
+                if base is not None:
+                        self.graph = base.graph
+                        self._node = _OverlayAtlas(base._node, self._overlay_node)
+                        self._adj = _OverlayAdjacency(base._adj, self._overlay_adj, self._overlay_node)
+                for point in points:
+                        self._overlay_node[point] = {'pos': point.pos, 'degree': 2}
+                        self._overlay_adj[point] = {}
+                        for node, length in point.endpoints():
+                                data = {weight: length}
+                                self._overlay_adj[point][node] = data
+                                self._overlay_adj.setdefault(node, {})[point] = data
+
+
+def endpoint_network(network, *nodes):
+        """ Returns the street network with the EdgePoints among the given nodes added (see EndpointNetwork),
+            or the street network itself if there are none.
+
+        Args:
+            network (nx.Graph): Street network
+            nodes: Nodes of the street network or EdgePoints, e.g. source and target of a path search
+        """
+        points = [node for node in nodes if isinstance(node, EdgePoint)]
+        if not points:
+                return network
+        return EndpointNetwork(network, points)
 
 
 def remove_intermediate_node(graph, name):
@@ -42,79 +212,534 @@ def remove_intermediate_node(graph, name):
         graph.remove_node(name)
 
 
+# --- Prepared Street Graph Cache ------
+
+# Version of the street graph preparation (see DistanceKeepingModel.read_graph), increase when the preparation 
+# or the cached street network arrays change
+GRAPH_CACHE_VERSION = 3
+
+def file_hash(path):
+        """ Returns the SHA-256 hash of the content of a file.
+
+            Args:
+            path: Path of the file
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+def graph_cache_key(streets_gpkg, scenario):
+        """ Returns the key of the cache entries of a street input file and scenario, 
+            derived from the hash of the input file, the scenario and GRAPH_CACHE_VERSION.
+
+            Args:
+            streets_gpkg: Path of the street input file
+            scenario: Scenario of the model run
+        """
+        return hashlib.sha256(("%s|%s|%s" % (file_hash(streets_gpkg), scenario, GRAPH_CACHE_VERSION)).encode()).hexdigest()
+
+def load_cached_graph(cache_dir, key, prepare):
+        """ Returns the prepared street graph of an input file and scenario from an on-disk cache. 
+            If the cache does not contain it yet, the graph is prepared and stored in the cache.
+            Entries are written atomically, so that parallel model runs can share the cache directory.
+
+            Args:
+            cache_dir: Directory of the cache
+            key: Key of the input file and scenario (see graph_cache_key)
+            prepare: Function without arguments returning the prepared street graph (any picklable object)
+        """
+        path = os.path.join(cache_dir, "graph_%s.pickle" % key)
+        try:
+                with open(path, 'rb') as file:
+                        return pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                pass
+        prepared = prepare()
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first, so that other processes never read an incomplete entry
+        handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+                with os.fdopen(handle, 'wb') as file:
+                        pickle.dump(prepared, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)
+        except BaseException:
+                os.remove(temp_path)
+                raise
+        return prepared
+
+def load_cached_arrays(cache_dir, name, compute):
+        """ Returns read-only arrays of the street network, stored as npy files in the directory name of the cache 
+            and memory-mapped, so that all model runs (also in parallel processes) share one copy of the arrays in memory.
+            If the cache does not contain them yet, the arrays are computed and stored in the cache.
+            Entries are written atomically, so that parallel model runs can share the cache directory.
+
+            Args:
+            cache_dir: Directory of the cache
+            name: Name of the entry, including the key of the input file and scenario (see graph_cache_key)
+            compute: Function without arguments returning a dict of numpy arrays by name
+        """
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+                arrays = compute()
+                os.makedirs(cache_dir, exist_ok=True)
+                temp_path = tempfile.mkdtemp(dir=cache_dir, suffix='.tmp')
+                for array_name, array in arrays.items():
+                        np.save(os.path.join(temp_path, array_name + '.npy'), array)
+                try:
+                        os.rename(temp_path, path)
+                except OSError:
+                        # the entry was written by another process in the meantime
+                        shutil.rmtree(temp_path)
+        return {file[:-len('.npy')]: np.load(os.path.join(path, file), mmap_mode='r') for file in os.listdir(path) if file.endswith('.npy')}
+
+
+# --- Edge State ------
+
+class EdgeState:
+        """ People counters and densities of all edges of the street network, stored in arrays indexed by a stable edge id.
+            Edge ids are given in order of graph.edges. The networkx edge attributes are only written, when 
+            an output needs them (see to_graph).
+
+        Args:
+            graph (nx.Graph): Street network with edge attributes mm_len and sidewalk_width
+            arrays (dict): Read-only edge lengths and sidewalk widths shared by model runs (see static_arrays), 
+                computed from the graph if not given
+        """
+
+        def __init__(self, graph, arrays=None):
+                self.edges = list(graph.edges)
+                # look up edge id of an edge by its nodes, in both directions
+                self.edge_ids = {}
+                for edge_id, (u, v) in enumerate(self.edges):
+                        self.edge_ids[u, v] = edge_id
+                        self.edge_ids[v, u] = edge_id
+                if arrays is None:
+                        arrays = EdgeState.static_arrays(graph)
+                self.mm_len = arrays['mm_len']
+                self.sidewalk_width = arrays['sidewalk_width']
+                # people counters (current count, change within current timestep, total count of all times)
+                self.ppl_count = np.zeros(len(self.edges), dtype=np.int64)
+                self.temp_ppl_increase = np.zeros(len(self.edges), dtype=np.int64)
+                self.ppl_total = np.zeros(len(self.edges), dtype=np.int64)
+                self.density = np.zeros(len(self.edges), dtype=float)
+                self.max_density = np.zeros(len(self.edges), dtype=float)
+
+        @staticmethod
+        def static_arrays(graph):
+                """ Returns the edge attributes that do not change during a model run as arrays, in order of the edge ids.
+
+                Args:
+                    graph (nx.Graph): Street network with edge attributes mm_len and sidewalk_width
+
+                Returns:
+                    dict: Arrays mm_len and sidewalk_width
+                """
+                return {
+                        'mm_len': np.array([data['mm_len'] for _, _, data in graph.edges(data=True)], dtype=float),
+                        'sidewalk_width': np.array([data['sidewalk_width'] for _, _, data in graph.edges(data=True)], dtype=float),
+                }
+
+        def update(self):
+                """ Update density (using the people count of the previous timestep), running maximum of density 
+                    and people count of all edges and reset the counter changes of the current timestep.
+                """
+                self.density = self.ppl_count / (self.mm_len * self.sidewalk_width)
+                self.ppl_count += self.temp_ppl_increase
+                np.maximum(self.density, self.max_density, out=self.max_density)
+                self.temp_ppl_increase[:] = 0
+
+        def as_dict(self, attribute):
+                """ Returns the values of an attribute as dict keyed by edge, as used by nx.set_edge_attributes.
+
+                Args:
+                    attribute (str): Name of the attribute, e.g. 'max_density'
+
+                Returns:
+                    dict: Value of the attribute by edge
+                """
+                return dict(zip(self.edges, getattr(self, attribute).tolist()))
+
+        def to_graph(self, graph, attributes=('ppl_count', 'density', 'temp_ppl_increase', 'ppl_total')):
+                """ Write the current values of the given attributes to the edges of a graph.
+
+                Args:
+                    graph (nx.Graph): Graph to write attributes to (must contain the edges of the edge state)
+                    attributes (tuple): Names of the attributes to write
+                """
+                for attribute in attributes:
+                        nx.set_edge_attributes(graph, self.as_dict(attribute), attribute)
+
+
 # --- SETTER FUNCTIONS ------
 
-def increase_edge_counter(edge, amount):
+def increase_edge_counter(edge_state, edge_id, amount):
         """ Increase people counter for a given edge by a given amount
 
             Args:
-            edge: The edge to increase the counter of 
+            edge_state: The EdgeState holding the counters
+            edge_id: The id of the edge to increase the counter of 
             amount: The amount to increase counter by 
         """
-        edge['temp_ppl_increase'] += amount
-        edge['ppl_total'] += amount
+        edge_state.temp_ppl_increase[edge_id] += amount
+        edge_state.ppl_total[edge_id] += amount
 
-def decrease_edge_counter(edge, amount):
+def decrease_edge_counter(edge_state, edge_id, amount):
         """ Decrease people counter for a given edge by a given amount
 
                 Args:
-                edge: The edge to decrease the counter of 
+                edge_state: The EdgeState holding the counters
+                edge_id: The id of the edge to decrease the counter of 
                 amount: The amount to decrease counter by 
         """
-        edge['temp_ppl_increase'] -= amount
+        edge_state.temp_ppl_increase[edge_id] -= amount
 
 # --- Alternative Path Computation --------
-def get_alternative_path(network, path, metric_path_length, previous_edge, ows, id, logging=False):
+class PathCutoff(nx.NetworkXNoPath):
+        """ Raised by path searches with a cutoff, if there are only paths longer than the cutoff.
+        """
+
+class ReachabilityIndex:
+        """ Answers whether two nodes of a network are connected when up to two of its edges are blocked, 
+            without searching the network for every query (e.g. to tell a path search stopped at a cutoff 
+            from a search without any path). For each first blocked edge, one depth first search of the network 
+            without that edge finds its connected components and bridges, which is cached and answers all queries 
+            with that edge. Blocking a second edge only separates two nodes of a component, if the edge is a bridge 
+            and exactly one of the nodes is in the subtree below it. Queries with more blocked edges are searched.
+
+        Args:
+            adjacency: Neighbors of each node (e.g. graph.adj)
+            nodes (list): Nodes of the network
+            maxsize (int): Maximum number of cached depth first searches
+        """
+
+        def __init__(self, adjacency, nodes, maxsize=1000):
+                self.adjacency = adjacency
+                self.nodes = nodes
+                self.maxsize = maxsize
+                self.trees = OrderedDict()
+
+        def tree(self, edge):
+                """ Returns the depth first search tree of the network without an edge, computing it if it is not cached.
+
+                Args:
+                    edge (tuple): The edge left out (None: no edge)
+
+                Returns:
+                    dict, dict, dict, dict, dict: By node, the root of its component, its parent in the tree, its visiting time, 
+                    the latest visiting time in its subtree and the earliest visiting time reachable from its subtree by a non-tree edge
+                """
+                if edge in self.trees:
+                        self.trees.move_to_end(edge)
+                        return self.trees[edge]
+                skipped = set() if edge is None else {tuple(edge), tuple(edge)[::-1]}
+                component, parent, tin, tout, low = {}, {}, {}, {}, {}
+                timer = 0
+                for root in self.nodes:
+                        if root in tin:
+                                continue
+                        component[root] = root
+                        parent[root] = None
+                        tin[root] = low[root] = timer
+                        timer += 1
+                        stack = [(root, iter(self.adjacency[root]))]
+                        while stack:
+                                node, neighbors = stack[-1]
+                                for neighbor in neighbors:
+                                        if neighbor == parent[node] or (node, neighbor) in skipped:
+                                                continue
+                                        if neighbor in tin:
+                                                low[node] = min(low[node], tin[neighbor])
+                                                continue
+                                        component[neighbor] = root
+                                        parent[neighbor] = node
+                                        tin[neighbor] = low[neighbor] = timer
+                                        timer += 1
+                                        stack.append((neighbor, iter(self.adjacency[neighbor])))
+                                        break
+                                else:
+                                        stack.pop()
+                                        tout[node] = timer - 1
+                                        if parent[node] is not None:
+                                                low[parent[node]] = min(low[parent[node]], low[node])
+                self.trees[edge] = (component, parent, tin, tout, low)
+                if len(self.trees) > self.maxsize:
+                        self.trees.popitem(last=False)
+                return self.trees[edge]
+
+        def has_path(self, source, target, blocked_edges=()):
+                """ Returns whether there is a path between two nodes, which does not use any of the blocked edges.
+
+                Args:
+                    source: Starting node of the path
+                    target: Final node of the path
+                    blocked_edges (list): Edges (tuples of nodes) that may not be used
+                """
+                blocked = list({frozenset(edge): tuple(edge) for edge in blocked_edges}.values())
+                if len(blocked) > 2:
+                        return self.search(source, target, blocked)
+                component, parent, tin, tout, low = self.tree(blocked[0] if blocked else None)
+                if component[source] != component[target]:
+                        return False
+                if len(blocked) < 2:
+                        return True
+                u, v = blocked[1]
+                if parent.get(u) == v:
+                        u, v = v, u
+                if parent.get(v) != u or low[v] <= tin[u]:
+                        # the second edge is not a bridge of the tree
+                        return True
+                below = lambda node: tin[v] <= tin[node] <= tout[v]
+                return below(source) == below(target)
+
+        def search(self, source, target, blocked_edges):
+                """ Returns whether there is a path between two nodes, which does not use any of the blocked edges, 
+                    by searching the network.
+
+                Args:
+                    source: Starting node of the path
+                    target: Final node of the path
+                    blocked_edges (list): Edges (tuples of nodes) that may not be used
+                """
+                blocked = {frozenset(edge) for edge in blocked_edges}
+                seen = {source}
+                stack = [source]
+                while stack:
+                        node = stack.pop()
+                        if node == target:
+                                return True
+                        for neighbor in self.adjacency[node]:
+                                if neighbor not in seen and frozenset((node, neighbor)) not in blocked:
+                                        seen.add(neighbor)
+                                        stack.append(neighbor)
+                return False
+
+
+def has_path_avoiding(network, source, target, blocked_edges):
+        """ Returns whether there is a path between two nodes of a street network, which does not use any of 
+            the blocked edges, from the reachability index of the network (computed once and stored in network.graph).
+
+        Args:
+            network (nx.Graph): Street network
+            source: Starting node of the path (node of the network or EdgePoint)
+            target: Final node of the path (node of the network or EdgePoint)
+            blocked_edges (list): Edges (tuples of nodes of the network) that may not be used
+        """
+        index = network.graph.get('reachability')
+        if index is None:
+                index = network.graph['reachability'] = ReachabilityIndex(network.adj, list(network.nodes))
+        # origins and destinations on an edge are reached via the nodes of their edge
+        sources = [node for node, _ in source.endpoints()] if isinstance(source, EdgePoint) else [source]
+        targets = [node for node, _ in target.endpoints()] if isinstance(target, EdgePoint) else [target]
+        return any(index.has_path(s, t, blocked_edges) for s in sources for t in targets)
+
+def _shortest_path_avoiding(network, source, target, blocked_edges, router=None, cutoff=None):
+        """ Returns the shortest path between two nodes of a network, which does not use any of the blocked edges.
+
+        Args:
+            network (nx.Graph): Graph to search for the path
+            source: Starting node of the path (node of the network or EdgePoint)
+            target: Final node of the path (node of the network or EdgePoint)
+            blocked_edges (list): Edges (tuples of nodes) that may not be used
+            router (routing.PathSearch): Path searches with the CSR router of the street network to use instead of networkx (optional)
+            cutoff (float): Maximum length of the path, longer paths are not searched (optional)
+
+        Returns:
+            list, float: The path and its length
+
+        Raises:
+            PathCutoff: If there are only paths longer than the cutoff
+            nx.NetworkXNoPath: If there is no path between source and target
+        """
+        if router is not None:
+            # blocked edges are excluded by an edge mask, the network is not modified
+            return router.shortest_path(network, source, target, blocked_edges, cutoff)
+
+        # origin or destination on an edge are added to a view of the network
+        street_network = network
+        network = endpoint_network(network, source, target)
+
+        # define function to remove edges from a network
+        def filter_edge(n1, n2):
+            return network[n1][n2].get("walkable", True)
+
+        # temporarily remove blocked edges from graph
+        for u, v in blocked_edges:
+            network[u][v]["walkable"] = False
+        try:
+            view = nx.subgraph_view(network, filter_edge=filter_edge)
+            if cutoff is None:
+                path = nx.dijkstra_path(view, source=source, target=target, weight='mm_len')
+            else:
+                try:
+                    # same search as nx.dijkstra_path, which stops at paths longer than the cutoff
+                    _, path = nx.single_source_dijkstra(view, source, target=target, cutoff=cutoff, weight='mm_len')
+                except nx.NetworkXNoPath:
+                    if has_path_avoiding(street_network, source, target, blocked_edges):
+                        raise PathCutoff("No path between %s and %s within %s." % (source, target, cutoff))
+                    raise
+            return path, nx.path_weight(view, path, weight='mm_len')
+        finally:
+            # reset filter attribute of blocked edges
+            for u, v in blocked_edges:
+                network[u][v]["walkable"] = True
+
+class AlternativePathCache:
+        """ Least recently used cache of alternative paths through the base street network shared by all agents.
+            Paths are keyed by current node, blocked edges and target node. Destinations on an edge (see EdgePoint) 
+            are resolved via the nodes of their edge, so that cached paths are valid for all agents.
+
+        Args:
+            base_network (nx.Graph): Undirected street network
+            maxsize (int): Maximum number of cached paths
+            router (routing.PathSearch): Path searches with the CSR router of the street network to use instead of networkx (optional)
+        """
+
+        def __init__(self, base_network, maxsize, router=None):
+                self.base_network = base_network
+                self.router = router
+                self.maxsize = maxsize
+                self.paths = OrderedDict()
+                self.hits = 0
+                self.misses = 0
+
+        def base_path(self, current_node, target, blocked_edges, cutoff=None):
+                """ Returns the cached shortest path between two nodes of the base network avoiding the blocked edges,
+                    computing it on a cache miss. Searches with a cutoff are cached as cut off at that length, which also
+                    answers later searches with a lower cutoff.
+
+                Args:
+                    current_node: Starting node of the path
+                    target: Final node of the path
+                    blocked_edges (list): Edges (tuples of nodes) that may not be used
+                    cutoff (float): Maximum length of the path (optional)
+
+                Returns:
+                    tuple: The path (tuple of nodes) and its length, None and the cutoff if there are only paths 
+                    longer than the cutoff, or None if there is no such path
+                """
+                key = (current_node, frozenset(frozenset(edge) for edge in blocked_edges), target)
+                result = self.paths.get(key, False)
+                if result is not False and (result is None or result[0] is not None or (cutoff is not None and cutoff <= result[1])):
+                        self.hits += 1
+                        self.paths.move_to_end(key)
+                        return result
+                self.misses += 1
+                try:
+                        path, length = _shortest_path_avoiding(self.base_network, current_node, target, blocked_edges, self.router, cutoff)
+                        result = (tuple(path), length)
+                except PathCutoff:
+                        result = (None, cutoff)
+                except nx.NetworkXNoPath:
+                        result = None
+                self.paths[key] = result
+                self.paths.move_to_end(key)
+                if len(self.paths) > self.maxsize:
+                        self.paths.popitem(last=False)
+                return result
+
+        def shortest_path(self, network, current_node, destination, blocked_edges, cutoff=None):
+                """ Returns the shortest path from the current node to the destination of an agent avoiding the blocked edges.
+
+                Args:
+                    network (nx.Graph): Street network
+                    current_node: Node the agent is at
+                    destination: Destination node or EdgePoint of the agent
+                    blocked_edges (list): Edges (tuples of nodes) that may not be used
+                    cutoff (float): Maximum length of the path (optional)
+
+                Returns:
+                    list, float: The path and its length
+
+                Raises:
+                    PathCutoff: If there are only paths longer than the cutoff
+                    nx.NetworkXNoPath: If there is no path between current node and destination
+                """
+                if isinstance(destination, EdgePoint):
+                        # a destination on an edge is reached via one of the nodes of its edge
+                        endpoints = destination.endpoints()
+                else:
+                        endpoints = [(destination, None)]
+                best = None
+                cut_off = False
+                for endpoint, edge_length in endpoints:
+                        endpoint_cutoff = cutoff - edge_length if cutoff is not None and edge_length is not None else cutoff
+                        result = self.base_path(current_node, endpoint, blocked_edges, endpoint_cutoff)
+                        if result is None:
+                                continue
+                        path, length = result
+                        if path is None:
+                                cut_off = True
+                                continue
+                        if edge_length is not None:
+                                path, length = path + (destination,), length + edge_length
+                        if best is None or length < best[1]:
+                                best = (path, length)
+                if cutoff is not None and (cut_off or best is not None) and (best is None or best[1] > cutoff):
+                        raise PathCutoff("No path between %s and %s within %s." % (current_node, destination, cutoff))
+                if best is None:
+                        raise nx.NetworkXNoPath("No path between %s and %s." % (current_node, destination))
+                return list(best[0]), best[1]
+
+def get_alternative_path(network, path, metric_path_length, previous_edge, ows, id, logging=False, cache=None, router=None, max_detour=None, distance_fields=None):
         """ Returns an alternative path from the current node of an agent to its destination, 
             which does not use the first edge of the current path. In general turning around is forbidden, 
             unless a (forbidden to enter) one way street is on the next edge. Then agent is allowed to turn around. 
             If there is no alternative path, return inital path.
+            If a maximum detour is given, the search stops at paths with a longer detour and returns None 
+            if there is no alternative path with a detour of at most max_detour (no useful alternative).
         
         Args:
-            network (nx.Graph): Graph to search for alternative path
-            path (list): Given path to find alternative to 
+            network (nx.Graph): Street network to search for alternative path
+            path (list): Given path to find alternative to (its last node may be an EdgePoint)
             metric_path_length (float): Length of the inital path 
-            previous_edge: the previously walked edge/street
+            previous_edge (tuple): the previously walked edge/street as tuple of its nodes
             ows (boolean): whether next intended edge is (forbidden to enter) one way street  
             id (int): id of the current agent  
             logging (boolean): whether logging shall be enabled (for debugging)
+            cache (AlternativePathCache): cache of alternative paths to use if possible (optional)
+            router (routing.PathSearch): Path searches with the CSR router of the street network to use instead of networkx (optional)
+            max_detour (float): Maximum detour of the alternative path (optional)
+            distance_fields (routing.DistanceFieldCache): distance fields of destinations to read the alternative path from if possible (optional)
 
         Returns:
-            list, float : The alternative path and the detour it takes
+            list, float : The alternative path and the detour it takes (None, None if there is no useful alternative)
         """
         # create variables for current node, the next node and the last node (destination) on the current path
         current_node = path[0]
         next_node = path[1]
         destination = path[-1]
         
-        # define function to remove edges from a network
-        def filter_edge(n1, n2):
-            return network[n1][n2].get("walkable", True)
-        
-        # temporarily remove next intended edge from graph
-        network[current_node][next_node]["walkable"] = False
-        # if next street is not a ows, filter also previous edge (forbids turning around!)
+        # block next intended edge, if next street is not a ows, block also previous edge (forbids turning around!)
+        blocked_edges = [(current_node, next_node)]
         if(not ows):
-            previous_edge['walkable'] = False
-        view = nx.subgraph_view(network, filter_edge=filter_edge)
+            blocked_edges.append(previous_edge)
+
+        # stop searching at paths longer than the current path plus the maximum detour
+        cutoff = metric_path_length + max_detour if max_detour is not None else None
 
         # try finding an alternative path
         try:
             # compute alternative path and its length
-            alt_path = nx.dijkstra_path(view, source=current_node, target=destination, weight='mm_len')
-            alt_length = nx.path_weight(view, alt_path, weight='mm_len')
-            # reset filter attribute for next intended edge and previous
-            network[current_node][next_node]["walkable"] = True
-            previous_edge['walkable'] = True
+            if distance_fields is not None:
+                alt_path, alt_length = distance_fields.shortest_path(network, current_node, destination, blocked_edges, cutoff)
+            elif cache is not None:
+                alt_path, alt_length = cache.shortest_path(network, current_node, destination, blocked_edges, cutoff)
+            else:
+                alt_path, alt_length = _shortest_path_avoiding(network, current_node, destination, blocked_edges, router, cutoff)
             if(logging):
                 # if logging: print alternative and current path lengths
                 print('alt: '+ str(alt_length) + ' orig: ' + str(metric_path_length))
             return alt_path, alt_length - metric_path_length
+
+        # if all alternative paths exceed the maximum detour there is no useful alternative
+        except PathCutoff:
+            if(logging):
+                print("No useful alternative for agent " + str(id) + ' at node ' + str(current_node)+ '.')
+            return None, None
         
         # if there is no alternative path return inital path
         except (nx.NetworkXNoPath) as e:
             print("No alternative for agent " + str(id) + ' at node ' + str(current_node)+ '.')
-            # reset filter attribute for next intended edge and previous
-            network[current_node][next_node]["walkable"] = True
-            previous_edge['walkable'] = True
-            return path, 0
\ No newline at end of file
+            return path, 0
@@ -1,11 +1,12 @@
 from shapely.geometry import Point, LineString
-from shapely.ops import split, nearest_points, snap
+from shapely.ops import split, nearest_points, snap, substring
 import numpy as np
 import networkx as nx
+from scipy.spatial import cKDTree
 
 
 
-def generate_random_point_on_line(graph, edges, rng):
+def generate_random_point_on_line(graph, edges, rng, node_index=None, sampler=None):
     """Create random origin, destination pair with minimum distance of min_dist between both points.
     
     Parameters
@@ -14,6 +15,10 @@ def generate_random_point_on_line(graph, edges, rng):
         Edges from networkx graph containing start and end node information
     rng : numpy.random._generator.Generator
        random generator with fixed seed
+    node_index : NodeIndex, optional
+        Index of the graph nodes by coordinate, used to find the nodes of the edge
+    sampler : EdgeSampler, optional
+        Sampler prepared from edges, used instead of edges and node_index (draws the same point)
 
     Returns
     -------
@@ -22,6 +27,8 @@ def generate_random_point_on_line(graph, edges, rng):
         nearest node on edge, other node on edge, distance to nearest node and 
         distance to other, far node.
     """
+    if sampler is not None:
+        return sampler.point_dicts(sampler.sample(rng))[0]
     # Create weight list by edge length
     weights = edges['mm_len'] / edges['mm_len'].sum()
     # Get random edge index using weight list as probability function
@@ -35,13 +42,13 @@ def generate_random_point_on_line(graph, edges, rng):
 
     # Get nearer and more remote node, and distances to both
     if distance <= rn_edge['mm_len']/2:
-        nearer_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[0])
-        remote_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[-1])
+        nearer_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[0], node_index)
+        remote_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[-1], node_index)
         dist_from_nearest = distance
         dist_from_remote = rn_edge['mm_len'] - distance
     else:
-        nearer_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[-1])
-        remote_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[0])
+        nearer_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[-1], node_index)
+        remote_node = find_point_node_at_coord(graph, rn_edge['geometry'].coords[0], node_index)
         dist_from_nearest = rn_edge['mm_len'] - distance
         dist_from_remote = distance
 
@@ -54,12 +61,455 @@ def generate_random_point_on_line(graph, edges, rng):
             'dist_from_remote': dist_from_remote
             }
 
-def find_point_node_at_coord(graph, coord):
+def find_point_node_at_coord(graph, coord, node_index=None):
+    """Find the node of a graph located at a coordinate.
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        Graph with node attribute 'pos'
+    coord : tuple
+        Coordinate of the node
+    node_index : NodeIndex, optional
+        Index of the graph nodes by coordinate. If not given, all nodes of the graph are scanned.
+
+    Returns
+    -------
+    node
+        The (first) node at the coordinate or None if there is no such node
+    """
+    if node_index is not None:
+        return node_index.find(coord)
     return next((x for x,y in graph.nodes(data=True) if y['pos']==coord), None)
     # return nodes.loc[nodes['geometry'] == Point(coord)]
 
 
-def get_random_org_dest(graph, edges, rng, min_dist):
+class NodeIndex:
+    """Index of graph nodes by coordinate ('pos' node attribute) for constant time node lookups.
+    Coordinates are matched exactly. If a tolerance is given, coordinates without exact match are 
+    matched to the nearest node within the tolerance using a KD-tree.
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        Graph with node attribute 'pos'
+    tolerance : float, optional
+        Maximum distance between coordinate and node for inexact matches
+    """
+
+    def __init__(self, graph, tolerance=None):
+        self.nodes = []
+        self.node_at = {}
+        for node, pos in graph.nodes(data='pos'):
+            # keep the first node per coordinate, as the linear scan over the graph nodes does
+            self.node_at.setdefault(pos, node)
+            self.nodes.append(node)
+        self.tolerance = tolerance
+        self.tree = None
+        if tolerance is not None:
+            self.tree = cKDTree([pos for node, pos in graph.nodes(data='pos')])
+
+    def find(self, coord):
+        """Find the node located at a coordinate.
+
+        Parameters
+        ----------
+        coord : tuple
+            Coordinate of the node
+
+        Returns
+        -------
+        node
+            The node at the coordinate or None if there is no such node
+        """
+        node = self.node_at.get(coord)
+        if node is None and self.tree is not None:
+            distance, index = self.tree.query(coord[:2], distance_upper_bound=self.tolerance)
+            if index < len(self.nodes):
+                node = self.nodes[index]
+        return node
+
+
+class EdgeSampler:
+    """Sampler of random points on the edges of a street network, prepared once from the edges GeoDataFrame.
+    Edges are chosen with probability proportional to their length and points are placed uniformly along the edge.
+    Samples are computed with NumPy arrays for any number of points at once and equal the points 
+    drawn by generate_random_point_on_line from the same random generator.
+
+    Parameters
+    ----------
+    edges : geopandas.geodataframe.GeoDataFrame
+        Edges from networkx graph
+    node_index : NodeIndex
+        Index of the graph nodes by coordinate, used to find the nodes of the edges
+    arrays : Dict
+        Read-only arrays shared by model runs (see static_arrays), computed from the edges if not given
+
+    The vertices, segment lengths and cumulative segment lengths of the edges are indexed by orientation 
+    (0: as the edge geometry, 1: reversed) and edge, for interpolation of positions on oriented edges (see interpolate).
+    """
+
+    def __init__(self, edges, node_index, arrays=None):
+        if arrays is None:
+            arrays = EdgeSampler.static_arrays(edges)
+        self.lengths = arrays['lengths']
+        self.cdf = arrays['cdf']
+        self.vertices = arrays['vertices']
+        self.segment_lengths = arrays['segment_lengths']
+        self.cum_lengths = arrays['cum_lengths']
+        self.start_node = [node_index.find(tuple(c)) for c in arrays['first_vertex'].tolist()]
+        self.end_node = [node_index.find(tuple(c)) for c in arrays['last_vertex'].tolist()]
+
+    @staticmethod
+    def static_arrays(edges):
+        """Compute the arrays of the sampler that only depend on the edges.
+
+        Parameters
+        ----------
+        edges : geopandas.geodataframe.GeoDataFrame
+            Edges from networkx graph
+
+        Returns
+        -------
+        arrays : Dict
+            Edge lengths, cumulative distribution of edge weights, padded vertices, segment lengths and 
+            cumulative segment lengths of both orientations, and first and last vertex of all edges
+        """
+        lengths = edges['mm_len'].to_numpy(dtype=float)
+        # cumulative distribution of edge weights, computed as rng.choice does for probabilities p
+        weights = lengths / edges['mm_len'].sum()
+        cdf = weights.cumsum()
+        cdf /= cdf[-1]
+        # vertices of all edges in both orientations, padded by repeating the last vertex
+        coords = [np.asarray(line.coords)[:, :2] for line in edges.geometry]
+        vertices = np.empty((2, len(coords), max(len(c) for c in coords), 2))
+        for i, c in enumerate(coords):
+            for orientation, oriented in enumerate((c, c[::-1])):
+                vertices[orientation, i, :len(c)] = oriented
+                vertices[orientation, i, len(c):] = oriented[-1]
+        segment_lengths_, cum_lengths = segment_lengths(vertices.reshape(-1, vertices.shape[2], 2))
+        segment_lengths_ = segment_lengths_.reshape(2, len(coords), -1)
+        cum_lengths = cum_lengths.reshape(2, len(coords), -1)
+        return {
+            'lengths': lengths, 'cdf': cdf, 'vertices': vertices, 'segment_lengths': segment_lengths_, 'cum_lengths': cum_lengths,
+            'first_vertex': np.array([c[0] for c in coords]), 'last_vertex': np.array([c[-1] for c in coords]),
+        }
+
+    def uniforms(self, rng, size=1):
+        """Draw the random numbers for size points from a random generator, two per point (edge and position on edge),
+        in the order used by generate_random_point_on_line.
+
+        Parameters
+        ----------
+        rng : numpy.random._generator.Generator
+            random generator with fixed seed
+        size : int
+            number of points
+
+        Returns
+        -------
+        uniforms : numpy.ndarray
+            Array of shape (size, 2)
+        """
+        return rng.random((size, 2))
+
+    def sample(self, rng, size=1):
+        """Draw random points on the edges.
+
+        Parameters
+        ----------
+        rng : numpy.random._generator.Generator
+            random generator with fixed seed
+        size : int
+            number of points
+
+        Returns
+        -------
+        points : Dict
+            Dict of arrays (see points_from_uniforms)
+        """
+        return self.points_from_uniforms(self.uniforms(rng, size))
+
+    def points_from_uniforms(self, uniforms):
+        """Compute random points on the edges from uniform random numbers.
+
+        Parameters
+        ----------
+        uniforms : numpy.ndarray
+            Array of shape (n, 2) with random numbers in [0, 1) choosing edge and position on edge
+
+        Returns
+        -------
+        points : Dict
+            Dict of arrays with x and y coordinates of the points, their edge, nearer and 
+            more remote node on the edge, and the distances to both.
+        """
+        edge = self.cdf.searchsorted(uniforms[:, 0], side='right')
+        length = self.lengths[edge]
+        distance = length * uniforms[:, 1]
+        x, y = self.interpolate(edge, np.zeros_like(edge), distance)
+        start_is_nearer = distance <= length / 2
+        start_node = [self.start_node[e] for e in edge.tolist()]
+        end_node = [self.end_node[e] for e in edge.tolist()]
+        return {
+            'x': x,
+            'y': y,
+            'edge': edge,
+            'nearer_node': [s if near else e for s, e, near in zip(start_node, end_node, start_is_nearer)],
+            'remote_node': [e if near else s for s, e, near in zip(start_node, end_node, start_is_nearer)],
+            'dist_from_nearer': np.where(start_is_nearer, distance, length - distance),
+            'dist_from_remote': np.where(start_is_nearer, length - distance, distance),
+        }
+
+    def interpolate(self, edge, orientation, distance):
+        """Vectorized version of LineString.interpolate on oriented edges, returning the same coordinates as shapely.
+
+        Parameters
+        ----------
+        edge : numpy.ndarray
+            Indices of the edges
+        orientation : numpy.ndarray
+            Orientation of each edge (0: as the edge geometry, 1: reversed)
+        distance : numpy.ndarray
+            Distance along each oriented edge
+
+        Returns
+        -------
+        x, y : numpy.ndarray, numpy.ndarray
+            Coordinates of the interpolated points
+        """
+        return interpolate_on_lines(self.vertices[orientation, edge], self.segment_lengths[orientation, edge], 
+                                    self.cum_lengths[orientation, edge], distance)
+
+    def index_directed_edges(self, directed_edges):
+        """Store the index and orientation of each edge in its oriented edges (as 'sampler_index'), 
+        so that positions on them are interpolated on the arrays of the sampler (see interpolate_on_edges).
+
+        Parameters
+        ----------
+        directed_edges : Dict
+            Oriented edges by (start, end) node tuple (see add_directed_edges)
+        """
+        for i, (start, end) in enumerate(zip(self.start_node, self.end_node)):
+            # a loop is only walked as its geometry, so its index is stored after the reversed orientation
+            if (end, start) in directed_edges:
+                directed_edges[end, start]['sampler_index'] = (i, 1)
+            if (start, end) in directed_edges:
+                directed_edges[start, end]['sampler_index'] = (i, 0)
+
+    def random_od_pairs(self, rngs, min_dist, origins=None):
+        """Draw random origin, destination pairs with a minimum distance of min_dist between both points for many 
+        random generators at once, e.g. one per agent. Each pair equals the pair drawn by get_random_org_dest 
+        (or get_random_dest, if origins are given) from the same random generator. 
+        Destinations too close to their origin are redrawn for all failing pairs at once.
+
+        Parameters
+        ----------
+        rngs : list
+            random generators (numpy.random._generator.Generator), one per pair
+        min_dist : number
+            minimum distance between origin and destination
+        origins : list, optional
+            Dicts of given origins (as returned by generate_random_point_on_line), one per pair. 
+            If given, only destinations are drawn.
+
+        Returns
+        -------
+        Origins, Destinations: list, list
+            Dicts for origins and destinations (see generate_random_point_on_line)
+        """
+        if origins is None:
+            uniforms = np.array([rng.random(4) for rng in rngs]).reshape(len(rngs), 4)
+            origin_points = self.points_from_uniforms(uniforms[:, :2])
+            origins = self.point_dicts(origin_points)
+            orig_x, orig_y = origin_points['x'], origin_points['y']
+            dest_uniforms = uniforms[:, 2:]
+        else:
+            orig_x = np.array([orig['point'].x for orig in origins])
+            orig_y = np.array([orig['point'].y for orig in origins])
+            dest_uniforms = np.array([rng.random(2) for rng in rngs]).reshape(len(rngs), 2)
+        # redraw destinations of all pairs not meeting the minimum distance
+        pending = np.arange(len(rngs))
+        while len(pending):
+            dest_points = self.points_from_uniforms(dest_uniforms[pending])
+            dx = dest_points['x'] - orig_x[pending]
+            dy = dest_points['y'] - orig_y[pending]
+            pending = pending[np.sqrt(dx * dx + dy * dy) < min_dist]
+            for i in pending.tolist():
+                dest_uniforms[i] = rngs[i].random(2)
+        return origins, self.point_dicts(self.points_from_uniforms(dest_uniforms))
+
+    def point_dicts(self, points):
+        """Convert sampled points to the dicts returned by generate_random_point_on_line.
+
+        Parameters
+        ----------
+        points : Dict
+            Dict of arrays as returned by sample
+
+        Returns
+        -------
+        points : list
+            List of dicts, one per point
+        """
+        return [{
+            'point': Point(x, y),
+            'nearer_node': nearer_node,
+            'remote_node': remote_node,
+            'dist_from_nearer': dist_from_nearer,
+            'dist_from_remote': dist_from_remote
+            } for x, y, nearer_node, remote_node, dist_from_nearer, dist_from_remote in zip(
+                points['x'].tolist(), points['y'].tolist(), points['nearer_node'], points['remote_node'], 
+                points['dist_from_nearer'].tolist(), points['dist_from_remote'].tolist())]
+
+
+def segment_lengths(vertices):
+    """Compute segment lengths and cumulative segment lengths of lines, the same way as GEOS does.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        Array of shape (n, k, 2) with the vertices of n lines
+
+    Returns
+    -------
+    segment_lengths, cum_lengths : numpy.ndarray, numpy.ndarray
+        Arrays of shape (n, k-1) with the length of each segment and the length of the line up to the end of each segment
+    """
+    dx = vertices[:, 1:, 0] - vertices[:, :-1, 0]
+    dy = vertices[:, 1:, 1] - vertices[:, :-1, 1]
+    lengths = np.sqrt(dx * dx + dy * dy)
+    return lengths, np.cumsum(lengths, axis=1)
+
+
+def interpolate_on_lines(vertices, segment_lengths, cum_lengths, distance):
+    """Vectorized version of LineString.interpolate, returning the same coordinates as shapely (GEOS).
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        Array of shape (n, k, 2) with the vertices of n lines (padded by repeating the last vertex)
+    segment_lengths : numpy.ndarray
+        Array of shape (n, k-1) with the segment lengths (see segment_lengths)
+    cum_lengths : numpy.ndarray
+        Array of shape (n, k-1) with the cumulative segment lengths (see segment_lengths)
+    distance : numpy.ndarray
+        Array of shape (n,) with the distance along each line
+
+    Returns
+    -------
+    x, y : numpy.ndarray, numpy.ndarray
+        Coordinates of the interpolated points
+    """
+    rows = np.arange(len(distance))
+    # the point lies on the first segment ending beyond the distance, or at the end of the line if there is none
+    beyond = cum_lengths > distance[:, None]
+    on_line = beyond.any(axis=1)
+    segment = beyond.argmax(axis=1)
+    segment_start = np.where(segment > 0, cum_lengths[rows, segment - 1], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (distance - segment_start) / segment_lengths[rows, segment]
+    p0 = vertices[rows, segment]
+    p1 = vertices[rows, segment + 1]
+    point = (p1 - p0) * fraction[:, None] + p0
+    point = np.where((fraction <= 0)[:, None], p0, point)
+    point = np.where((fraction >= 1)[:, None], p1, point)
+    point = np.where(on_line[:, None], point, vertices[:, -1])
+    return point[:, 0], point[:, 1]
+
+
+def interpolate_on_edges(edges, distance, sampler=None):
+    """Vectorized version of edge['geometry'].interpolate(distance) for many oriented edges at once
+    (see orient_edge), returning the same coordinates as shapely. Edges indexed by the sampler 
+    (see EdgeSampler.index_directed_edges) are interpolated on its arrays, other edges (e.g. parts of edges 
+    to origins and destinations) on their own vertices.
+
+    Parameters
+    ----------
+    edges : list
+        Oriented edges (dicts with vertices, segment_lengths and cum_lengths)
+    distance : numpy.ndarray
+        Array with the distance along each edge
+    sampler : EdgeSampler, optional
+        Sampler holding the arrays of the edges of the street network
+
+    Returns
+    -------
+    x, y : numpy.ndarray, numpy.ndarray
+        Coordinates of the interpolated points
+    """
+    index = np.array([edge.get('sampler_index', (-1, 0)) for edge in edges], dtype=np.int64).reshape(-1, 2)
+    indexed = index[:, 0] >= 0 if sampler is not None else np.zeros(len(edges), dtype=bool)
+    x = np.empty(len(edges))
+    y = np.empty(len(edges))
+    if indexed.any():
+        x[indexed], y[indexed] = sampler.interpolate(index[indexed, 0], index[indexed, 1], distance[indexed])
+    others = np.flatnonzero(~indexed)
+    if len(others):
+        x[others], y[others] = interpolate_on_edge_data([edges[i] for i in others.tolist()], distance[others])
+    return x, y
+
+
+def interpolate_on_edge_data(edges, distance):
+    """Interpolate positions on oriented edges from the vertices, segment lengths and cumulative segment lengths 
+    stored in the edges, padded to the same number of vertices (see interpolate_on_edges).
+
+    Parameters
+    ----------
+    edges : list
+        Oriented edges (dicts with vertices, segment_lengths and cum_lengths)
+    distance : numpy.ndarray
+        Array with the distance along each edge
+
+    Returns
+    -------
+    x, y : numpy.ndarray, numpy.ndarray
+        Coordinates of the interpolated points
+    """
+    # pad the vertices of all edges to the same number by repeating the last vertex
+    size = max(len(edge['vertices']) for edge in edges)
+    vertices = np.empty((len(edges), size, 2))
+    segments = np.zeros((len(edges), size - 1))
+    cum_lengths = np.empty((len(edges), size - 1))
+    for i, edge in enumerate(edges):
+        n = len(edge['vertices'])
+        vertices[i, :n] = edge['vertices']
+        vertices[i, n:] = edge['vertices'][-1]
+        segments[i, :n - 1] = edge['segment_lengths']
+        cum_lengths[i, :n - 1] = edge['cum_lengths']
+        cum_lengths[i, n - 1:] = edge['cum_lengths'][-1]
+    return interpolate_on_lines(vertices, segments, cum_lengths, distance)
+
+
+def node_point_dict(graph, node, neighbor):
+    """Returns a node as a point dict as returned by generate_random_point_on_line, i.e. as point at the node end 
+        of the edge between the node and a neighbor (e.g. for origins and destinations at nodes).
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        Graph containing the node with attribute pos
+    node : node
+        The node
+    neighbor : node
+        Neighbor of the node defining the edge of the point
+
+    Returns
+    -------
+    point : dict
+        Dict with point, nearer_node, remote_node, dist_from_nearer and dist_from_remote
+    """
+    x, y = graph.nodes[node]['pos']
+    return {
+        'point': Point(x, y),
+        'nearer_node': node,
+        'remote_node': neighbor,
+        'dist_from_nearer': 0,
+        'dist_from_remote': graph[node][neighbor]['mm_len']
+        }
+
+
+def get_random_org_dest(graph, edges, rng, min_dist, node_index=None, sampler=None):
     """Create random origin, destination pair with minimum distance of min_dist between both points.
     
     Parameters
@@ -68,6 +518,10 @@ def get_random_org_dest(graph, edges, rng, min_dist):
         Edges from networkx graph containing start and end node information
     min_dist : number
         minimum distance between origin and destination
+    node_index : NodeIndex, optional
+        Index of the graph nodes by coordinate, used to find the nodes of the edges
+    sampler : EdgeSampler, optional
+        Sampler prepared from edges, used instead of edges and node_index
 
     Returns
     -------
@@ -75,13 +529,13 @@ def get_random_org_dest(graph, edges, rng, min_dist):
         Dicts for origin and destination and including nearest node id and id of wider away other node on edge, and distances to both. 
 
     """
-    orig = generate_random_point_on_line(graph, edges, rng)
-    dest = generate_random_point_on_line(graph, edges, rng)
+    orig = generate_random_point_on_line(graph, edges, rng, node_index, sampler)
+    dest = generate_random_point_on_line(graph, edges, rng, node_index, sampler)
     while orig['point'].distance(dest['point']) < min_dist:
-        dest = generate_random_point_on_line(graph, edges, rng)
+        dest = generate_random_point_on_line(graph, edges, rng, node_index, sampler)
     return orig, dest
 
-def get_random_dest(graph, orig, edges, rng, min_dist):
+def get_random_dest(graph, orig, edges, rng, min_dist, node_index=None, sampler=None):
     """Create random origin, destination pair with minimum distance of min_dist between both points.
     
     Parameters
@@ -90,6 +544,10 @@ def get_random_dest(graph, orig, edges, rng, min_dist):
         Edges from networkx graph containing start and end node information
     min_dist : number
         minimum distance between origin and destination
+    node_index : NodeIndex, optional
+        Index of the graph nodes by coordinate, used to find the nodes of the edges
+    sampler : EdgeSampler, optional
+        Sampler prepared from edges, used instead of edges and node_index
 
     Returns
     -------
@@ -97,42 +555,145 @@ def get_random_dest(graph, orig, edges, rng, min_dist):
         Dicts for origin and destination and including nearest node id and id of wider away other node on edge, and distances to both. 
 
     """
-    dest = generate_random_point_on_line(graph, edges, rng)
+    dest = generate_random_point_on_line(graph, edges, rng, node_index, sampler)
     while orig['point'].distance(dest['point']) < min_dist:
-        dest = generate_random_point_on_line(graph, edges, rng)
+        dest = generate_random_point_on_line(graph, edges, rng, node_index, sampler)
     return dest
 
 
 
 def get_directed_edge(graph: nx.Graph, start, end):
     """
-        Get edge from graph and check whether the edge starts at current node and ends at next node or the other way around, eventually switch direction and adjust one way attributes. 
+        Get edge from graph oriented from start to end node, i.e. with a geometry starting at the start node and 
+        one way attributes for walking from start to end node. Oriented edges are looked up from the edges 
+        precomputed in graph.graph['directed_edges'] (see add_directed_edges), otherwise they are computed (see orient_edge). 
+        The returned edge must not be changed. 
         
         Parameters
         ----------
-        edge : shapely.geometry.line.Linestring
-            Edge from graph
+        graph : networkx.Graph
+            Graph containing the edge
+        start : node
+            Node to start walking on the edge from
+        end : node
+            Node to walk to on the edge
 
         Returns
         -------
         edge
             The corrected edge 
     """
-    edge = graph.get_edge_data(start, end)
-    owr = False
-    ow = False
-    if(edge['geometry'].coords[0] != graph.nodes[start]['pos']):
-    # invert indice order
-        if edge['one_way']:
-            owr = True
-        if edge['one_way_reversed']:
-            ow = True
-        edge['geometry'] = LineString(list(edge['geometry'].coords)[::-1])
+    directed_edges = graph.graph.get('directed_edges')
+    if directed_edges is not None:
+        edge = directed_edges.get((start, end))
+        if edge is not None:
+            return edge
+    return orient_edge(graph, start, end)
+
+
+def orient_edge(graph: nx.Graph, start, end):
+    """
+        Create a copy of an edge oriented from start to end node. Checks whether the edge geometry starts at the start node 
+        and ends at the end node or the other way around, eventually switches direction and adjusts one way attributes. 
+        The edge in the graph is not changed.
+        
+        Parameters
+        ----------
+        graph : networkx.Graph
+            Graph containing the edge
+        start : node
+            Node to start walking on the edge from
+        end : node
+            Node to walk to on the edge
+
+        Returns
+        -------
+        edge
+            Copy of the edge data with corrected geometry, one_way and one_way_reversed attributes, 
+            and arrays of the vertices, segment lengths and cumulative segment lengths of the geometry
+    """
+    return orient_edge_data(graph.get_edge_data(start, end), graph.nodes[start]['pos'])
+
+
+def orient_edge_data(edge, start_pos):
+    """
+        Create a copy of edge data oriented to start at a position, see orient_edge.
+        
+        Parameters
+        ----------
+        edge : dict
+            Edge data with geometry and one way attributes
+        start_pos : tuple
+            Coordinates of the node (or point) to start walking on the edge from
+
+        Returns
+        -------
+        edge
+            Copy of the edge data with corrected geometry, one_way and one_way_reversed attributes, 
+            and arrays of the vertices, segment lengths and cumulative segment lengths of the geometry
+    """
+    if(edge['geometry'].coords[0] != start_pos):
+        # invert indice order
+        edge = dict(edge, geometry=LineString(list(edge['geometry'].coords)[::-1]), 
+                    one_way=bool(edge['one_way_reversed']), one_way_reversed=bool(edge['one_way']))
     else:
-        if edge['one_way']:
-            ow = True
-        if edge['one_way_reversed']:
-            owr = True
-    edge['one_way'] = ow
-    edge['one_way_reversed'] = owr 
+        edge = dict(edge, one_way=bool(edge['one_way']), one_way_reversed=bool(edge['one_way_reversed']))
+    # vertices and segment lengths of the oriented geometry for interpolation of positions (see interpolate_on_edges)
+    edge['vertices'] = np.asarray(edge['geometry'].coords)[:, :2]
+    segments, cum_lengths = segment_lengths(edge['vertices'][None])
+    edge['segment_lengths'] = segments[0]
+    edge['cum_lengths'] = cum_lengths[0]
     return edge
+
+
+def get_directed_edge_part(graph: nx.Graph, point, node, from_point):
+    """
+        Get the part of an edge between a point on the edge (origin or destination of an agent, see graph_helpers.EdgePoint) 
+        and one of the nodes of the edge, oriented from the point to the node or from the node to the point. 
+        The geometry of the part is cut from the edge geometry only when it is requested, i.e. when an agent walks on it.
+        
+        Parameters
+        ----------
+        graph : networkx.Graph
+            Graph containing the edge
+        point : graph_helpers.EdgePoint
+            Point on the edge
+        node : node
+            Nearer or remote node of the edge of the point
+        from_point : bool
+            Whether to orient the part from the point to the node (True) or from the node to the point (False)
+
+        Returns
+        -------
+        edge
+            The oriented part of the edge (see orient_edge)
+    """
+    edge = get_directed_edge(graph, point.nearer_node, point.remote_node)
+    if(node == point.nearer_node):
+        geometry = substring(edge['geometry'], start_dist=0, end_dist=point.dist_from_nearer)
+        part = {'mm_len': point.dist_from_nearer, 'geometry': LineString(list(geometry.coords)[::-1]), 'ID': point.name + "_1",
+                'one_way': not edge['one_way'], 'one_way_reversed': not edge['one_way_reversed']}
+    else:
+        geometry = substring(edge['geometry'], start_dist=point.dist_from_nearer, end_dist=edge['geometry'].length)
+        part = {'mm_len': point.dist_from_remote, 'geometry': geometry, 'ID': point.name + "_2",
+                'one_way': edge['one_way'], 'one_way_reversed': edge['one_way_reversed']}
+    part.update(highway=edge['highway'], sidewalk_width=edge['sidewalk_width'])
+    return orient_edge_data(part, point.pos if from_point else graph.nodes[node]['pos'])
+
+
+def add_directed_edges(graph: nx.Graph, edges=None):
+    """
+        Precompute both orientations of edges of a graph and store them in graph.graph['directed_edges'], 
+        keyed by (start, end) node tuple, for lookups by get_directed_edge.
+        
+        Parameters
+        ----------
+        graph : networkx.Graph
+            Graph containing the edges
+        edges : list, optional
+            Edges (tuples of nodes) to add, all edges of the graph if not given
+    """
+    directed_edges = graph.graph.setdefault('directed_edges', {})
+    for u, v in (graph.edges if edges is None else edges):
+        directed_edges[u, v] = orient_edge(graph, u, v)
+        directed_edges[v, u] = orient_edge(graph, v, u)
@@ -0,0 +1,211 @@
+import os
+import struct
+import numpy as np
+from pathlib import Path
+
+
+class NpyAppender:
+    """Writes rows to a .npy file (readable with numpy.load) in several chunks, so that recorded outputs can be
+        written to disk while the model is running. The header is written with space for the largest possible
+        number of rows and rewritten with the actual number of rows when the file is closed.
+        The file is only created when the first rows are appended.
+
+    Args:
+        path (str): Path of the .npy file
+        dtype (numpy.dtype): Data type of the rows
+        row_shape (tuple): Shape of one row (empty for rows of single values)
+    """
+
+    MAGIC = b'\x93NUMPY\x01\x00'
+
+    def __init__(self, path, dtype, row_shape=()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.rows = 0
+        self.file = None
+        self.closed = False
+        # total length of magic string, header length and header is a multiple of 64, as written by numpy.save
+        prefix_length = len(self.MAGIC) + 2
+        self.header_length = -(-(prefix_length + len(self.header(np.iinfo(np.int64).max)) + 1) // 64) * 64 - prefix_length
+
+    def header(self, rows):
+        """Returns the header dict of the file with a given number of rows as string.
+
+        Args:
+            rows (int): Number of rows
+
+        Returns:
+            str: The header
+        """
+        return "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (np.lib.format.dtype_to_descr(self.dtype), (rows,) + self.row_shape)
+
+    def write_header(self):
+        """Write the header with the current number of rows at the beginning of the file.
+        """
+        self.file.seek(0)
+        self.file.write(self.MAGIC + struct.pack('<H', self.header_length))
+        self.file.write(self.header(self.rows).ljust(self.header_length - 1).encode('latin1') + b'\n')
+
+    def append(self, rows):
+        """Append rows to the file.
+
+        Args:
+            rows (numpy.ndarray): Array of shape (n,) + row_shape
+        """
+        if(self.file is None):
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, 'w+b')
+            self.write_header()
+        self.file.seek(0, os.SEEK_END)
+        np.ascontiguousarray(rows, dtype=self.dtype).tofile(self.file)
+        self.rows += len(rows)
+
+    def close(self):
+        """Rewrite the header with the final number of rows and close the file (creating an empty file if no rows were appended).
+        """
+        if(self.closed):
+            return
+        if(self.file is None):
+            self.append(np.empty((0,) + self.row_shape, dtype=self.dtype))
+        self.write_header()
+        self.file.close()
+        self.file = None
+        self.closed = True
+
+
+class EdgeTimeSeries:
+    """People counters and densities of all edges in every timestep, recorded from the model's EdgeState
+        into a dense steps x edges matrix instead of one GeoDataFrame per timestep.
+        Each row holds one timestep (the row index is the step counter), each column one edge (in order of the edge ids of the EdgeState).
+        Recorded rows are kept in memory until they are flushed to the .npy file at path.
+        The edge geometries are stored only once (see spatial_output_creator.save_edges_to_file).
+
+    Args:
+        edge_state (gh.EdgeState): People counters and densities of the edges
+        path (str): Path of the output file
+    """
+
+    # recorded attributes of the EdgeState, stored as fields of a structured array
+    DTYPE = np.dtype([('ppl_count', np.float32), ('density', np.float32), ('ppl_total', np.float32)])
+
+    def __init__(self, edge_state, path):
+        self.edge_state = edge_state
+        self.rows = []
+        self.file = NpyAppender(path, self.DTYPE, (len(edge_state.edges),))
+
+    @property
+    def nbytes(self):
+        """Size of the rows kept in memory in bytes."""
+        return len(self.rows) * len(self.edge_state.edges) * self.DTYPE.itemsize
+
+    def record(self):
+        """Store the current people counters and densities of all edges as a new row.
+        """
+        row = np.empty(len(self.edge_state.edges), dtype=self.DTYPE)
+        for name in self.DTYPE.names:
+            row[name] = getattr(self.edge_state, name)
+        self.rows.append(row)
+
+    def flush(self):
+        """Append the rows kept in memory to the output file.
+        """
+        if(len(self.rows) > 0):
+            self.file.append(np.stack(self.rows))
+            self.rows = []
+
+    def save(self):
+        """Write all remaining rows and complete the output file.
+
+        Returns:
+            str: Path of the output file
+        """
+        self.flush()
+        self.file.close()
+        return self.file.path
+
+
+class TrajectoryRecorder:
+    """Locations and compliance status of agents over time, recorded into a preallocated structured array
+        instead of one location dict per agent and timestep. When the array is full or the recorder is flushed,
+        its rows are written as a block to the output file (see spatial_output_creator.PositionsWriter), 
+        so that memory use is bounded by the buffer size.
+        Nodes in latest_node are stored as codes (see node_labels), as they can be nodes of the graph or names of origins and destinations on edges.
+
+    Args:
+        agents (ap.AgentList): Agents to record
+        writer (spatial_output_creator.PositionsWriter): Writer of the output file, receiving the rows and node_labels of each block
+        interval (int): Record every n-th timestep
+        buffer_size (int): Number of rows kept in memory before they are written to the output file
+    """
+
+    DTYPE = np.dtype([
+        ('agentID', np.int32), ('route_counter', np.int32), ('latest_node', np.int32),
+        ('non_compliance', np.bool_), ('compliance', np.bool_), ('no_route_change', np.bool_), ('random_rerouting', np.bool_),
+        ('counter', np.int32), ('x', np.float64), ('y', np.float64)
+    ])
+
+    def __init__(self, agents, writer, interval=1, buffer_size=100000):
+        self.agents = agents
+        self.interval = interval
+        # the buffer holds at least all agents of one timestep
+        self.buffer = np.empty(max(buffer_size, len(agents)), dtype=self.DTYPE)
+        self.size = 0
+        self.writer = writer
+        self.node_labels = []
+        self.node_codes = {}
+
+    @property
+    def nbytes(self):
+        """Size of the rows kept in memory in bytes."""
+        return self.size * self.DTYPE.itemsize
+
+    def node_code(self, node):
+        """Returns the code of a node, assigning a new code to nodes not seen before.
+
+        Args:
+            node: Node of the graph or name of an origin or destination on an edge
+
+        Returns:
+            int: Index of the node in node_labels
+        """
+        code = self.node_codes.get(node)
+        if(code is None):
+            code = self.node_codes[node] = len(self.node_labels)
+            self.node_labels.append(node)
+        return code
+
+    def record(self, step):
+        """Store the current location of all agents as new rows, if the step is a recorded timestep.
+
+        Args:
+            step (int): The current step counter
+        """
+        if(step % self.interval != 0):
+            return
+        if(self.size + len(self.agents) > len(self.buffer)):
+            self.flush()
+        rows = [(location['agentID'], location['route_counter'], self.node_code(location['latest_node']),
+                 location['non_compliance'], location['compliance'], location['no_route_change'], location['random_rerouting'],
+                 step, location['x'], location['y']) for location in self.agents.location]
+        self.buffer[self.size:self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def flush(self):
+        """Write the rows in the buffer to the output file and empty the buffer.
+        """
+        if(self.size > 0):
+            self.writer.append(self.buffer[:self.size], self.node_labels)
+            self.size = 0
+
+    def save(self):
+        """Write all remaining rows and complete the output file (also without any recorded rows). 
+            No further rows can be recorded afterwards.
+
+        Returns:
+            float, int: Time needed for writing in seconds and size of the output file in bytes
+        """
+        self.flush()
+        if(self.writer.blocks == 0):
+            self.writer.append(self.buffer[:0], self.node_labels)
+        return self.writer.close()
@@ -0,0 +1,754 @@
+import networkx as nx
+import numpy as np
+import graph_helpers as gh
+import math
+from collections import OrderedDict, namedtuple
+from heapq import heappop, heappush
+from itertools import count
+from scipy.sparse import csgraph, csr_matrix
+
+
+# Routing tables and CSR routers by street network, so that runs of an experiment in the same process compute each once
+_routing_tables = {}
+_csr_routers = {}
+
+# Search algorithms of the CSR router (model parameter 'routing_algorithm')
+ROUTING_ALGORITHMS = ('dijkstra', 'astar', 'bidirectional')
+
+# Origins and destinations on edges (see gh.EdgePoint) mapped to ids of the CSR router (see CsrRouter.overlay)
+Overlay = namedtuple('Overlay', ['nodes', 'index', 'neighbors', 'pos'])
+
+# Result of a path search of the CSR router (see CsrRouter.search)
+SearchResult = namedtuple('SearchResult', ['path', 'length', 'expanded', 'cut_off'])
+
+
+def adjacency_matrix(graph, weight='mm_len'):
+    """Returns the adjacency matrix of a street network for the shortest path functions of scipy.sparse.csgraph.
+
+    Args:
+        graph (nx.Graph): Undirected street network
+        weight (str): Edge attribute used as edge length
+
+    Returns:
+        scipy.sparse.csr_matrix: Edge lengths between the nodes, in order of graph.nodes
+    """
+    matrix = nx.to_scipy_sparse_array(graph, nodelist=list(graph.nodes), weight=weight, format='csr')
+    # csgraph requires 32 bit indices
+    return csr_matrix((matrix.data, matrix.indices.astype(np.int32), matrix.indptr.astype(np.int32)), shape=matrix.shape)
+
+
+def get_routing_table(graph, key, cache_dir=None):
+    """Returns the routing table of a street network, computing it only once per network and process.
+        If a cache directory is given, the table is stored there once and memory-mapped by all processes (see gh.load_cached_arrays).
+
+    Args:
+        graph (nx.Graph): Undirected street network
+        key: Key identifying the street network (e.g. path of the input file or gh.graph_cache_key)
+        cache_dir (str): Directory of the cache of street network arrays (None: table is computed by every process)
+
+    Returns:
+        RoutingTable: The routing table of the street network
+    """
+    if key not in _routing_tables:
+        if cache_dir is None:
+            arrays = None
+        else:
+            arrays = gh.load_cached_arrays(cache_dir, 'routing_%s' % key, lambda: RoutingTable.static_arrays(graph))
+        _routing_tables[key] = RoutingTable(graph, arrays=arrays)
+    return _routing_tables[key]
+
+
+def get_csr_router(graph, key, cache_dir=None):
+    """Returns the CSR router of a street network, building it only once per network and process.
+        If a cache directory is given, its arrays are stored there once and memory-mapped by all processes (see gh.load_cached_arrays).
+
+    Args:
+        graph (nx.Graph): Undirected street network
+        key: Key identifying the street network (e.g. path of the input file or gh.graph_cache_key)
+        cache_dir (str): Directory of the cache of street network arrays (None: arrays are built by every process)
+
+    Returns:
+        CsrRouter: The CSR router of the street network
+    """
+    if key not in _csr_routers:
+        if cache_dir is None:
+            arrays = None
+        else:
+            arrays = gh.load_cached_arrays(cache_dir, 'csr_%s' % key, lambda: CsrRouter.static_arrays(graph))
+        _csr_routers[key] = CsrRouter(graph, arrays=arrays)
+    return _csr_routers[key]
+
+
+class RoutingTable:
+    """All-pairs shortest path distances and predecessors between the intersections (real nodes) of a street network.
+        Shortest paths between nodes of the street network, or origins and destinations on its edges
+        (see gh.EdgePoint), are resolved from the table instead of running a new path search.
+
+    Args:
+        graph (nx.Graph): Undirected street network
+        weight (str): Edge attribute used as edge length
+        arrays (dict): Read-only distances and predecessors shared by model runs (see static_arrays), computed if not given
+    """
+
+    def __init__(self, graph, weight='mm_len', arrays=None):
+        self.weight = weight
+        self.nodes = list(graph.nodes)
+        self.node_index = {node: index for index, node in enumerate(self.nodes)}
+        if arrays is None:
+            arrays = RoutingTable.static_arrays(graph, weight)
+        self.dist = arrays['dist']
+        self.pred = arrays['pred']
+
+    @staticmethod
+    def static_arrays(graph, weight='mm_len'):
+        """Computes the shortest path distances and predecessors between all nodes of a street network, in order of graph.nodes.
+
+        Args:
+            graph (nx.Graph): Undirected street network
+            weight (str): Edge attribute used as edge length
+
+        Returns:
+            dict: Arrays dist and pred
+        """
+        dist, pred = csgraph.shortest_path(adjacency_matrix(graph, weight), method='D', directed=False, return_predecessors=True)
+        return {'dist': dist, 'pred': pred}
+
+    def node_path(self, source, target):
+        """Returns the shortest path between two nodes of the street network.
+
+        Args:
+            source: Starting node of the path
+            target: Final node of the path
+
+        Returns:
+            list: Nodes of the shortest path
+        """
+        source_index = self.node_index[source]
+        index = self.node_index[target]
+        if np.isinf(self.dist[source_index, index]):
+            raise nx.NetworkXNoPath("No path between %s and %s." % (source, target))
+        path = [target]
+        while index != source_index:
+            index = self.pred[source_index, index]
+            path.append(self.nodes[index])
+        path.reverse()
+        return path
+
+    def endpoints(self, node):
+        """Returns the nodes of the street network from which a node can be reached, and the distances to them.
+            Nodes of the street network are their own endpoint, origins and destinations on edges are reached via the nodes of their edge.
+
+        Args:
+            node: Node of the street network or gh.EdgePoint
+
+        Returns:
+            list: Tuples of endpoint node and distance to node
+        """
+        if isinstance(node, gh.EdgePoint):
+            return node.endpoints()
+        return [(node, 0)]
+
+    def shortest_path(self, orig, dest):
+        """Returns the shortest path between two nodes of the street network, which may be origins and destinations 
+            on its edges (see gh.EdgePoint). The path is combined from the table path between the endpoints 
+            of origin and destination with the shortest total length.
+
+        Args:
+            orig: Origin node or gh.EdgePoint
+            dest: Destination node or gh.EdgePoint
+
+        Returns:
+            list: Nodes of the shortest path
+        """
+        best = None
+        for orig_endpoint, orig_len in self.endpoints(orig):
+            for dest_endpoint, dest_len in self.endpoints(dest):
+                length = orig_len + self.dist[self.node_index[orig_endpoint], self.node_index[dest_endpoint]] + dest_len
+                if best is None or length < best[0]:
+                    best = (length, orig_endpoint, dest_endpoint)
+        if best is None or np.isinf(best[0]):
+            raise nx.NetworkXNoPath("No path between %s and %s." % (orig, dest))
+        path = self.node_path(best[1], best[2])
+        if orig != best[1]:
+            path.insert(0, orig)
+        if dest != best[2]:
+            path.append(dest)
+        return path
+
+
+class DistanceFieldCache:
+    """Least recently used cache of distance fields of destinations, shared by all agents. The distance field of a node 
+        of the street network holds the shortest path distances of all nodes to the node and the next node on these paths,
+        i.e. a shortest path tree rooted at the node. Destinations on edges (see gh.EdgePoint) are reached via 
+        the nodes of their edge, which have a distance field each.
+
+        An alternative path at an intersection is the shortest of all paths taking an allowed edge to a neighbor and
+        continuing on the shortest path from the neighbor to the destination, read from the distance field. 
+        Only if the continuation of the shortest of them uses a blocked edge, the search continues from the neighbors 
+        (A* with the distances to the destination as heuristic), until a node with a continuation without blocked edges is reached.
+        Of several shortest paths, another one than found by a path search may be chosen.
+
+    Args:
+        graph (nx.Graph): Undirected street network
+        maxsize (int): Maximum number of cached distance fields
+        routing_table (RoutingTable): Table of the street network to read the distance fields from instead of computing them (optional)
+        weight (str): Edge attribute used as edge length
+    """
+
+    def __init__(self, graph, maxsize, routing_table=None, weight='mm_len'):
+        self.graph = graph
+        self.maxsize = maxsize
+        self.routing_table = routing_table
+        self.weight = weight
+        self.nodes = list(graph.nodes)
+        self.node_index = {node: index for index, node in enumerate(self.nodes)}
+        self.matrix = None
+        self.fields = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # nodes expanded beyond the current node, as the continuation of the shortest neighbor uses a blocked edge
+        self.expansions = 0
+
+    def field(self, node):
+        """Returns the distance field of a node of the street network, computing it if it is not cached.
+
+        Args:
+            node: Node of the street network
+
+        Returns:
+            numpy.ndarray, numpy.ndarray: Distances to the node and next nodes towards it (negative for the node itself 
+            and unreachable nodes), both by index of the nodes
+        """
+        index = self.node_index[node]
+        if self.routing_table is not None:
+            # shortest paths are symmetric, the predecessors of paths from the node are the next nodes of paths to it
+            self.hits += 1
+            return self.routing_table.dist[index], self.routing_table.pred[index]
+        if node in self.fields:
+            self.hits += 1
+            self.fields.move_to_end(node)
+            return self.fields[node]
+        self.misses += 1
+        if self.matrix is None:
+            self.matrix = adjacency_matrix(self.graph, self.weight)
+        self.fields[node] = csgraph.dijkstra(self.matrix, directed=False, indices=index, return_predecessors=True)
+        if len(self.fields) > self.maxsize:
+            self.fields.popitem(last=False)
+        return self.fields[node]
+
+    def shortest_path(self, network, current_node, destination, blocked_edges, cutoff=None):
+        """Returns the shortest path from the current node to the destination of an agent avoiding the blocked edges,
+            from the distance fields of the destination (see DistanceFieldCache).
+
+        Args:
+            network (nx.Graph): Street network
+            current_node: Node the agent is at
+            destination: Destination node or gh.EdgePoint of the agent
+            blocked_edges (list): Edges (tuples of nodes) that may not be used
+            cutoff (float): Maximum length of the path (optional)
+
+        Returns:
+            list, float: The path and its length
+
+        Raises:
+            gh.PathCutoff: If there are only paths longer than the cutoff
+            nx.NetworkXNoPath: If there is no path between current node and destination
+        """
+        on_edge = isinstance(destination, gh.EdgePoint)
+        endpoints = dict(destination.endpoints()) if on_edge else {destination: 0}
+        fields = {endpoint: self.field(endpoint) for endpoint in endpoints}
+        blocked = {frozenset(edge) for edge in blocked_edges}
+
+        def remaining(node):
+            # distance from a node to the destination and the endpoint it is reached by
+            if node == destination:
+                return 0, None
+            best = (math.inf, None)
+            index = self.node_index[node]
+            for endpoint, offset in endpoints.items():
+                length = fields[endpoint][0][index] + offset
+                if length < best[0]:
+                    best = (length, endpoint)
+            return best
+
+        def neighbors(node):
+            # neighbors of a node and the lengths of the edges to them, a destination on an edge follows the neighbors of its nodes
+            adjacent = [(neighbor, data[self.weight]) for neighbor, data in network[node].items()]
+            if on_edge and node in endpoints:
+                adjacent.append((destination, endpoints[node]))
+            return adjacent
+
+        def continuation(node, via):
+            # shortest path from a node to the destination (see remaining)
+            if node == destination:
+                return [node]
+            pred = fields[via][1]
+            path = [node]
+            index = self.node_index[node]
+            while self.nodes[index] != via:
+                index = pred[index]
+                path.append(self.nodes[index])
+            if via != destination:
+                path.append(destination)
+            return path
+
+        # A* search, in which the distances to the destination are exact as long as the continuation has no blocked edge
+        c = count()
+        length, via = remaining(current_node)
+        if length == math.inf:
+            raise nx.NetworkXNoPath("No path between %s and %s." % (current_node, destination))
+        queue = [(length, next(c), current_node, 0, via, None)]
+        parents = {}
+        while queue:
+            (f, _, node, g, via, parent) = heappop(queue)
+            if node in parents:
+                continue
+            parents[node] = parent
+            if cutoff is not None and f > cutoff:
+                # all remaining paths are longer than the cutoff, unless the destination cannot be reached at all
+                if gh.has_path_avoiding(network, current_node, destination, blocked_edges):
+                    raise gh.PathCutoff("No path between %s and %s within %s." % (current_node, destination, cutoff))
+                raise nx.NetworkXNoPath("No path between %s and %s." % (current_node, destination))
+            rest = continuation(node, via)
+            if not any(frozenset(edge) in blocked for edge in zip(rest[:-1], rest[1:])):
+                path = [node]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                path = path[::-1] + rest[1:]
+                length = gh.path_weight(network, path, weight=self.weight)
+                if cutoff is not None and length > cutoff:
+                    raise gh.PathCutoff("No path between %s and %s within %s." % (current_node, destination, cutoff))
+                return path, length
+            if node != current_node:
+                self.expansions += 1
+            for neighbor, edge_length in neighbors(node):
+                if neighbor in parents or frozenset((node, neighbor)) in blocked:
+                    continue
+                length, neighbor_via = remaining(neighbor)
+                if length < math.inf:
+                    neighbor_g = g + edge_length
+                    heappush(queue, (neighbor_g + length, next(c), neighbor, neighbor_g, neighbor_via, node))
+        raise nx.NetworkXNoPath("No path between %s and %s." % (current_node, destination))
+
+
+class CsrRouter:
+    """Shortest path searches on a street network stored as compressed sparse row (CSR) arrays, with integer node ids
+        (positions in graph.nodes) and edge lengths as arrays, instead of the dict-of-dicts graph of networkx 
+        (model parameter 'routing_backend'). Edges which may not be used are excluded by a boolean edge mask 
+        instead of changing an attribute of the graph and searching a subgraph view.
+        Origins and destinations on edges (see gh.EdgePoint) get the ids following the nodes of the street network.
+
+        Paths are searched with Dijkstra's algorithm, A* or bidirectional Dijkstra (see ROUTING_ALGORITHMS).
+        Dijkstra visits neighbors in the order of the networkx adjacency and breaks ties as in nx.dijkstra_path,
+        so that both backends return the same paths. A* uses the straight-line distance between the node positions 
+        as heuristic, which never exceeds the length of the edge geometries. A* and bidirectional Dijkstra return 
+        paths of the same length as Dijkstra, but may choose a different one of several shortest paths.
+
+    Args:
+        graph (nx.Graph): Undirected street network with node attribute pos
+        weight (str): Edge attribute used as edge length
+        arrays (dict): Read-only CSR arrays shared by model runs (see static_arrays), computed if not given
+    """
+
+    def __init__(self, graph, weight='mm_len', arrays=None):
+        self.weight = weight
+        self.nodes = list(graph.nodes)
+        self.node_index = {node: index for index, node in enumerate(self.nodes)}
+        if arrays is None:
+            arrays = CsrRouter.static_arrays(graph, weight)
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.weights = arrays['weights']
+        self.edge_ids = arrays['edge_ids']
+        self.edge_count = int(self.edge_ids.max()) + 1 if len(self.edge_ids) > 0 else 0
+        # neighbors of every node as tuples of node id, edge length and edge id, for fast access in the search loop
+        indptr = self.indptr.tolist()
+        neighbors = list(zip(self.indices.tolist(), self.weights.tolist(), self.edge_ids.tolist()))
+        self.adjacency = [neighbors[start:end] for start, end in zip(indptr[:-1], indptr[1:])]
+        self.pos = [tuple(pos) for pos in arrays['pos'].tolist()]
+
+    @staticmethod
+    def static_arrays(graph, weight='mm_len'):
+        """Computes the CSR arrays of a street network: the neighbors of node i are indices[indptr[i]:indptr[i + 1]]
+            (in order of the networkx adjacency), with the edge lengths in weights and the ids of the undirected edges in edge_ids.
+            The coordinates of node i are pos[i].
+
+        Args:
+            graph (nx.Graph): Undirected street network with node attribute pos
+            weight (str): Edge attribute used as edge length
+
+        Returns:
+            dict: Arrays indptr, indices, weights, edge_ids and pos
+        """
+        node_index = {node: index for index, node in enumerate(graph.nodes)}
+        edge_index = {}
+        indptr = [0]
+        indices = []
+        weights = []
+        edge_ids = []
+        for node in graph.nodes:
+            for neighbor, data in graph.adj[node].items():
+                indices.append(node_index[neighbor])
+                weights.append(data.get(weight, 1))
+                edge_ids.append(edge_index.setdefault(frozenset((node, neighbor)), len(edge_index)))
+            indptr.append(len(indices))
+        pos = np.array([graph.nodes[node]['pos'] for node in graph.nodes], dtype=np.float64).reshape(-1, 2)
+        return {'indptr': np.array(indptr, dtype=np.int64), 'indices': np.array(indices, dtype=np.int64),
+                'weights': np.array(weights, dtype=np.float64), 'edge_ids': np.array(edge_ids, dtype=np.int64), 'pos': pos}
+
+    def overlay(self, *nodes):
+        """Returns the origins and destinations on edges among the nodes of a search with their ids and positions, 
+            and the parts of their edges connecting them to the nodes of the edges as additional neighbors 
+            (appended to the neighbors of the street network). The parts get the edge ids following the edges of the street network.
+
+        Args:
+            nodes: Nodes of the street network or gh.EdgePoints, e.g. source and target of a search
+
+        Returns:
+            Overlay: The points (in order of their ids), their ids, the additional neighbors and the positions by node id
+        """
+        points = [node for node in nodes if isinstance(node, gh.EdgePoint)]
+        index = {point: len(self.nodes) + i for i, point in enumerate(points)}
+        extra = {}
+        edge_id = self.edge_count
+        for point in points:
+            extra[index[point]] = []
+            for node, length in point.endpoints():
+                node_id = self.node_index[node]
+                extra[index[point]].append((node_id, length, edge_id))
+                extra.setdefault(node_id, []).append((index[point], length, edge_id))
+                edge_id += 1
+        pos = {index[point]: point.pos for point in points}
+        return Overlay(points, index, extra, pos)
+
+    def node_id(self, node, overlay):
+        """Returns the id of a node of the street network or a gh.EdgePoint.
+
+        Args:
+            node: The node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+
+        Returns:
+            int: Id of the node
+        """
+        node_id = self.node_index.get(node)
+        return overlay.index[node] if node_id is None else node_id
+
+    def node_label(self, node_id, overlay):
+        """Returns the node of an id.
+
+        Args:
+            node_id (int): Id of the node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+
+        Returns:
+            The node
+        """
+        return self.nodes[node_id] if node_id < len(self.nodes) else overlay.nodes[node_id - len(self.nodes)]
+
+    def neighbors(self, node_id, overlay):
+        """Returns the neighbors of a node as tuples of node id, edge length and edge id.
+
+        Args:
+            node_id (int): Id of the node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+
+        Returns:
+            list: Neighbors of the node
+        """
+        neighbors = self.adjacency[node_id] if node_id < len(self.adjacency) else []
+        if node_id in overlay.neighbors:
+            neighbors = neighbors + overlay.neighbors[node_id]
+        return neighbors
+
+    def edge_mask(self, edges, overlay):
+        """Returns a boolean mask of all edges (including the parts of edges in the overlay), which is False for the given edges.
+
+        Args:
+            edges (list): Edges (tuples of nodes) that may not be used
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+
+        Returns:
+            numpy.ndarray: The edge mask
+        """
+        mask = np.ones(self.edge_count + sum(len(neighbors) for neighbors in overlay.neighbors.values()), dtype=bool)
+        for u, v in edges:
+            v_id = self.node_id(v, overlay)
+            edge_ids = [edge_id for neighbor, _, edge_id in self.neighbors(self.node_id(u, overlay), overlay) if neighbor == v_id]
+            if not edge_ids:
+                raise KeyError("Edge (%s, %s) is not part of the network." % (u, v))
+            mask[edge_ids] = False
+        return mask
+
+    def dijkstra(self, source, target, overlay, mask=None, cutoff=None):
+        """Dijkstra search between two nodes by id, visiting neighbors and breaking ties as nx.dijkstra_path.
+
+        Args:
+            source (int): Id of the starting node
+            target (int): Id of the final node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+            mask (numpy.ndarray): Edges that may be used (see edge_mask, None: all edges)
+            cutoff (float): Paths longer than the cutoff are not searched (None: no cutoff)
+
+        Returns:
+            list, int: Node ids of the shortest path (None if there is no path) and the number of expanded nodes
+        """
+        dist = {}
+        seen = {source: 0}
+        pred = {source: None}
+        c = count()
+        fringe = [(0, next(c), source)]
+        while fringe:
+            (d, _, v) = heappop(fringe)
+            if v in dist:
+                continue
+            dist[v] = d
+            if v == target:
+                break
+            for u, cost, edge_id in self.neighbors(v, overlay):
+                if mask is not None and not mask[edge_id]:
+                    continue
+                vu_dist = d + cost
+                if cutoff is not None and vu_dist > cutoff:
+                    continue
+                if u in dist:
+                    continue
+                if u not in seen or vu_dist < seen[u]:
+                    seen[u] = vu_dist
+                    pred[u] = v
+                    heappush(fringe, (vu_dist, next(c), u))
+        if target not in dist:
+            return None, len(dist)
+        return self._path(pred, target), len(dist)
+
+    def astar(self, source, target, overlay, mask=None, cutoff=None):
+        """A* search between two nodes by id, with the straight-line distance to the target as heuristic 
+            (same order of visiting neighbors and breaking ties as nx.astar_path).
+
+        Args:
+            source (int): Id of the starting node
+            target (int): Id of the final node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+            mask (numpy.ndarray): Edges that may be used (see edge_mask, None: all edges)
+            cutoff (float): Paths longer than the cutoff are not searched (None: no cutoff)
+
+        Returns:
+            list, int: Node ids of the shortest path (None if there is no path) and the number of expanded nodes
+        """
+        base_count = len(self.pos)
+        target_x, target_y = self.pos[target] if target < base_count else overlay.pos[target]
+        c = count()
+        queue = [(0, next(c), source, 0, None)]
+        enqueued = {}
+        explored = {}
+        while queue:
+            _, _, v, d, parent = heappop(queue)
+            if v == target:
+                explored[v] = parent
+                return self._path(explored, target), len(explored)
+            if v in explored:
+                if explored[v] is None:
+                    continue
+                if enqueued[v][0] < d:
+                    continue
+            explored[v] = parent
+            for u, cost, edge_id in self.neighbors(v, overlay):
+                if mask is not None and not mask[edge_id]:
+                    continue
+                u_dist = d + cost
+                if u in enqueued:
+                    u_queued, h = enqueued[u]
+                    if u_queued <= u_dist:
+                        continue
+                else:
+                    x, y = self.pos[u] if u < base_count else overlay.pos[u]
+                    h = math.hypot(x - target_x, y - target_y)
+                if cutoff is not None and u_dist + h > cutoff:
+                    # all paths via the node are longer than the cutoff
+                    continue
+                enqueued[u] = u_dist, h
+                heappush(queue, (u_dist + h, next(c), u, u_dist, v))
+        return None, len(explored)
+
+    def bidirectional_dijkstra(self, source, target, overlay, mask=None, cutoff=None):
+        """Bidirectional Dijkstra search between two nodes by id, alternately expanding nodes from source and target
+            (same order of visiting neighbors and breaking ties as nx.bidirectional_dijkstra).
+
+        Args:
+            source (int): Id of the starting node
+            target (int): Id of the final node
+            overlay (Overlay): Origins and destinations on edges (see overlay)
+            mask (numpy.ndarray): Edges that may be used (see edge_mask, None: all edges)
+            cutoff (float): Paths longer than the cutoff are not searched (None: no cutoff)
+
+        Returns:
+            list, int: Node ids of the shortest path (None if there is no path) and the number of expanded nodes
+        """
+        if source == target:
+            return [source], 1
+        dists = [{}, {}]
+        preds = [{source: None}, {target: None}]
+        seen = [{source: 0}, {target: 0}]
+        c = count()
+        fringe = [[(0, next(c), source)], [(0, next(c), target)]]
+        final_dist = None
+        meeting_node = None
+        direction = 1
+        while fringe[0] and fringe[1]:
+            direction = 1 - direction
+            (d, _, v) = heappop(fringe[direction])
+            if v in dists[direction]:
+                continue
+            dists[direction][v] = d
+            if v in dists[1 - direction]:
+                # path from the source to the meeting node and back from the meeting node to the target
+                path = self._path(preds[0], meeting_node)
+                node = preds[1][meeting_node]
+                while node is not None:
+                    path.append(node)
+                    node = preds[1][node]
+                return path, len(dists[0]) + len(dists[1])
+            for u, cost, edge_id in self.neighbors(v, overlay):
+                if mask is not None and not mask[edge_id]:
+                    continue
+                vu_dist = d + cost
+                if cutoff is not None and vu_dist > cutoff:
+                    continue
+                if u in dists[direction]:
+                    continue
+                if u not in seen[direction] or vu_dist < seen[direction][u]:
+                    seen[direction][u] = vu_dist
+                    preds[direction][u] = v
+                    heappush(fringe[direction], (vu_dist, next(c), u))
+                    if u in seen[0] and u in seen[1]:
+                        total_dist = seen[0][u] + seen[1][u]
+                        if final_dist is None or final_dist > total_dist:
+                            final_dist = total_dist
+                            meeting_node = u
+        return None, len(dists[0]) + len(dists[1])
+
+    @staticmethod
+    def _path(pred, target):
+        """Returns the path to a node from the predecessors of a search."""
+        path = [target]
+        while pred[path[-1]] is not None:
+            path.append(pred[path[-1]])
+        path.reverse()
+        return path
+
+    def search(self, network, source, target, blocked_edges=(), algorithm='dijkstra', cutoff=None):
+        """Searches the shortest path between two nodes of the street network, which does not use any of the blocked edges. 
+            Origins and destinations on edges (see gh.EdgePoint) are connected to the nodes of their edges (see overlay).
+            With Dijkstra's algorithm, the same result as nx.dijkstra_path and nx.path_weight on gh.endpoint_network.
+            With a cutoff, only paths of at most that length are found.
+
+        Args:
+            network (nx.Graph): Street network (held by the router as CSR arrays)
+            source: Starting node or gh.EdgePoint of the path
+            target: Final node or gh.EdgePoint of the path
+            blocked_edges (list): Edges (tuples of nodes) that may not be used
+            algorithm (str): Search algorithm, one of ROUTING_ALGORITHMS
+            cutoff (float): Maximum length of the path (None: no cutoff)
+
+        Returns:
+            SearchResult: The path and its length (both None if there is no path), the number of nodes expanded by 
+                the search and whether there are only paths longer than the cutoff
+        """
+        overlay = self.overlay(source, target)
+        mask = self.edge_mask(blocked_edges, overlay) if blocked_edges else None
+        if algorithm == 'dijkstra':
+            search = self.dijkstra
+        elif algorithm == 'astar':
+            search = self.astar
+        elif algorithm == 'bidirectional':
+            search = self.bidirectional_dijkstra
+        else:
+            raise ValueError("Unknown routing algorithm '%s', choose one of %s." % (algorithm, ", ".join(ROUTING_ALGORITHMS)))
+        source_id = self.node_id(source, overlay)
+        target_id = self.node_id(target, overlay)
+        path, expanded = search(source_id, target_id, overlay, mask, cutoff)
+        if path is None:
+            return SearchResult(None, None, expanded, cutoff is not None and gh.has_path_avoiding(network, source, target, blocked_edges))
+        length = self._path_weight(path, overlay)
+        if cutoff is not None and length > cutoff:
+            # bidirectional search can meet on a path longer than the cutoff
+            return SearchResult(None, None, expanded, True)
+        return SearchResult([self.node_label(node_id, overlay) for node_id in path], length, expanded, False)
+
+    def _path_weight(self, path, overlay):
+        """Returns the length of a path of node ids, summed from its first to its last edge as nx.path_weight."""
+        length = 0
+        for u, v in zip(path[:-1], path[1:]):
+            length += next(cost for neighbor, cost, _ in self.neighbors(u, overlay) if neighbor == v)
+        return length
+
+    def path_weight(self, network, path):
+        """Returns the length of a path in the street network, whose first and last node may be gh.EdgePoints. 
+            Same result as gh.path_weight.
+
+        Args:
+            network (nx.Graph): Street network (held by the router as CSR arrays)
+            path (list): Nodes of the path
+
+        Returns:
+            float: Length of the path
+        """
+        overlay = self.overlay(path[0], path[-1])
+        return self._path_weight([self.node_id(node, overlay) for node in path], overlay)
+
+
+class PathSearch:
+    """Path searches of a model run with the CSR router of its street network and a search algorithm, 
+        counting the number of searches and of nodes expanded by them (e.g. to compare search algorithms).
+
+    Args:
+        router (CsrRouter): CSR router of the street network
+        algorithm (str): Search algorithm, one of ROUTING_ALGORITHMS
+    """
+
+    def __init__(self, router, algorithm='dijkstra'):
+        if algorithm not in ROUTING_ALGORITHMS:
+            raise ValueError("Unknown routing algorithm '%s', choose one of %s." % (algorithm, ", ".join(ROUTING_ALGORITHMS)))
+        self.router = router
+        self.algorithm = algorithm
+        self.searches = 0
+        self.expansions = 0
+
+    def shortest_path(self, network, source, target, blocked_edges=(), cutoff=None):
+        """Returns the shortest path between two nodes of the street network, 
+            which does not use any of the blocked edges (see CsrRouter.search).
+
+        Args:
+            network (nx.Graph): Street network
+            source: Starting node or gh.EdgePoint of the path
+            target: Final node or gh.EdgePoint of the path
+            blocked_edges (list): Edges (tuples of nodes) that may not be used
+            cutoff (float): Maximum length of the path (None: no cutoff)
+
+        Returns:
+            list, float: The path and its length
+
+        Raises:
+            gh.PathCutoff: If there are only paths longer than the cutoff
+            nx.NetworkXNoPath: If there is no path between source and target
+        """
+        self.searches += 1
+        result = self.router.search(network, source, target, blocked_edges, self.algorithm, cutoff)
+        self.expansions += result.expanded
+        if result.cut_off:
+            raise gh.PathCutoff("No path between %s and %s within %s." % (source, target, cutoff))
+        if result.path is None:
+            raise nx.NetworkXNoPath("No path between %s and %s." % (source, target))
+        return result.path, result.length
+
+    def path_weight(self, network, path):
+        """Returns the length of a path in the street network (see CsrRouter.path_weight).
+
+        Args:
+            network (nx.Graph): Street network
+            path (list): Nodes of the path
+
+        Returns:
+            float: Length of the path
+        """
+        return self.router.path_weight(network, path)
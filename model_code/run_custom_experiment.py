@@ -49,6 +49,8 @@ parameters = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample = ap.Sample(parameters, randomize=False)
@@ -53,6 +53,8 @@ if __name__ == "__main__":
         'max_densities': False,
         # Add logs for debugging
         'logging': False,
+        # Skip agent positions in space, which are only needed for animation
+        'headless': True,
     }
     # SENSITIVITY ANALYSIS SPECIFIC PARAMETERS
 
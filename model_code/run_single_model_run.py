@@ -36,6 +36,8 @@ parameters = {
     'assign_new_destinations': True,
     # Whether only new destinations shall be assigned and previous destination is used as origin
     'reuse_previous_dest_as_orig': False,
+    # Choose origins and destinations of agents from pairs of nodes (False: random origins and destinations). 
+    # The shortest path of each pair is computed once when the model is set up and used by all agents.
     'origin_destination_pairs': False,
     # 'origin_destination_pairs': tuple([tuple([27,9]),tuple([32,27]),tuple([0,39])]),
     # Whether positions, edges and destination should be saved as gpkg files:
@@ -44,8 +46,55 @@ parameters = {
     'destination_log': False,
     'compliance_nodes': False,
     'max_densities': False,
+    # Record positions only every n-th timestep, only for the agents with the given ids (None: all agents),
+    # and keep at most this number of positions in memory before writing them to the output file
+    'positions_interval': 1,
+    'positions_agents': None,
+    'positions_buffer_size': 1000000,
+    # Write recorded outputs to disk every n-th timestep (None: only at the end of the run) and whenever 
+    # the recorded outputs kept in memory exceed the memory budget in megabytes
+    'output_flush_interval': None,
+    'output_memory_budget': 1000,
+    # File format of spatial outputs: 'gpkg' (e.g. for qgis) or 'parquet' (GeoParquet, faster and smaller, requires pyarrow)
+    'output_format': 'gpkg',
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
+    # Choose engine to simulate walking of the agents (all produce identical results for a given seed):
+    # 'agents' = every agent keeps its walking state and walks on its own
+    # 'arrays' = walking state of all agents is kept in arrays owned by the model and all agents walk at once
+    # 'events' = agents are only processed in timesteps in which they reach an intersection
+    'engine': 'agents',
+    # Whether initial shortest paths are resolved from shortest paths between all intersections, 
+    # computed once per street network (True, default) or searched for every route (False). Both give the same paths.
+    'precomputed_routing': True,
+    # Choose backend of shortest path searches (both give the same paths):
+    # 'networkx' = networkx searches on the graph
+    # 'csr' = searches on the street network stored as compressed sparse row arrays, blocked edges are excluded by an edge mask
+    'routing_backend': 'networkx',
+    # Choose search algorithm of the 'csr' routing backend (all find paths of the same length, the number of 
+    # expanded nodes is reported as node_expansions):
+    # 'dijkstra' = same paths as networkx
+    # 'astar' = A* with the straight-line distance to the destination as heuristic
+    # 'bidirectional' = bidirectional Dijkstra
+    'routing_algorithm': 'dijkstra',
+    # Maximum detour of alternative paths searched when evaluating rerouting, alternatives with a longer detour are not 
+    # evaluated and the agent keeps its path (None: no maximum). Either a detour in meters or 'weights' to derive it from the 
+    # weights of the agent, as the detour above which the agent keeps its path with a probability of at least 1 - tolerance.
+    'alt_path_max_detour': None,
+    'alt_path_detour_tolerance': 0.001,
+    # Maximum number of alternative paths cached and shared between agents (0 disables the cache). 
+    'alt_path_cache_size': 10000,
+    # Maximum number of distance fields of destinations (shortest path trees) cached and shared between agents, from which 
+    # alternative paths are read instead of searched if possible (0 disables them). Read from the precomputed routing table if enabled.
+    # Alternative paths have the same length as searched ones, but of several shortest paths another one may be chosen.
+    'distance_field_cache_size': 0,
+    # Directory of the cache of prepared street graphs and read-only street network arrays (memory-mapped, also by parallel processes),
+    # shared by all model runs with the same input file and scenario (None disables the cache)
+    'graph_cache_dir': './Experiment/cache',
+    # Maximum distance for matching edge end points to nodes without exact coordinate match (None: exact matches only). 
+    'node_coord_tolerance': None,
 }
 
 model = distkiss_abm.DistanceKeepingModel(parameters)
@@ -49,6 +49,8 @@ parameters_compliance_study = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample_compliance_study = ap.Sample(parameters_compliance_study, randomize=False)
@@ -106,6 +108,8 @@ parameters_no_ows = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample_no_ows = ap.Sample(parameters_no_ows, randomize=False)
@@ -162,6 +166,8 @@ parameters_4_ows = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample_4_ows = ap.Sample(parameters_4_ows, randomize=False)
@@ -218,6 +224,8 @@ parameters_8_ows = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample_8_ows = ap.Sample(parameters_8_ows, randomize=False)
@@ -273,6 +281,8 @@ parameters_10_ows = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 sample_10_ows = ap.Sample(parameters_10_ows, randomize=False)
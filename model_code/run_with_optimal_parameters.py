@@ -45,6 +45,8 @@ optimal_parameters = {
     'max_densities': True,
     # Add logs for debugging
     'logging': False,
+    # Skip agent positions in space, which are only needed for animation
+    'headless': True,
 }
 
 model = distkiss_abm.DistanceKeepingModel(optimal_parameters)
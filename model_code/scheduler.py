@@ -0,0 +1,190 @@
+import agentpy as ap
+import heapq
+import math
+
+
+class ArrivalScheduler:
+    """Priority queue of the next events of all walking agents, used by the 'events' engine of the model
+        (model parameter 'engine'). Instead of letting every agent walk in every step, the step in which an agent
+        reaches the next node of its path is computed once when it starts walking on an edge.
+        Only agents with an event in a step are processed in that step. Walking distances of the steps
+        in between are applied when needed (see Pedestrian.catch_up_walking).
+
+        There are two kinds of events, processed in the order of the phases of a model step:
+        NODE: the agent is on a node at the beginning of the step (see DistanceKeepingModel.step)
+        ARRIVAL: the agent reaches the next node while walking in the step
+        Agents with events in the same step and phase are returned in order of their creation (agent id).
+    """
+
+    NODE = 0
+    ARRIVAL = 1
+
+    def __init__(self):
+        self.queue = []
+        # first walking step of all scheduled agents by agent id
+        self.scheduled = {}
+        # scheduled agents by their first walking step, until they are added to the walking agents (see agents_walking_in)
+        self.starting = {}
+        # scheduled agents which walked on their current edge for a full timestep, by agent id
+        self.walking = {}
+
+    def _push(self, event, agent):
+        """Add the next event of an agent to the queue, replacing its previous event."""
+        heapq.heappush(self.queue, event + (agent.id, agent))
+        self.scheduled[agent.id] = agent.pending_walk_step
+        self.walking.pop(agent.id, None)
+        self.starting.setdefault(agent.pending_walk_step, []).append(agent)
+
+    def schedule(self, agent, step, node_checked=False):
+        """Schedule the next event of an agent that starts walking on its current edge in a step.
+            The event step is found by repeating the distance updates of Pedestrian.stop_walking_after_timestep,
+            so that it equals the step in which the agent would reach the node when walking every step.
+
+        Args:
+            agent (Pedestrian): Agent with remaining_dist_on_edge set to the length of its current edge
+            step (int): First step in which the agent walks on the edge
+            node_checked (boolean): whether the agent was already processed on a node in this step
+        """
+        agent.pending_walk_step = step
+        remaining = agent.remaining_dist_on_edge
+        walking_distance = agent.walking_distance
+        k = 0
+        while True:
+            if(remaining == 0 and (k > 0 or not node_checked)):
+                # the agent is on a node at the beginning of step + k without having walked beyond it
+                event = (step + k, self.NODE)
+                break
+            if(walking_distance > remaining):
+                event = (step + k, self.ARRIVAL)
+                break
+            if(walking_distance <= 0):
+                # the agent never reaches the next node
+                event = (math.inf, self.ARRIVAL)
+                break
+            remaining = remaining - walking_distance
+            k += 1
+        self._push(event, agent)
+
+    def schedule_node(self, agent, step):
+        """Schedule an agent that stopped at a node to be processed on the node in a step.
+
+        Args:
+            agent (Pedestrian): Agent on a node
+            step (int): Step in which the agent is processed on the node
+        """
+        agent.pending_walk_step = step
+        self._push((step, self.NODE), agent)
+
+    def pop(self, step, phase):
+        """Remove and return all agents with an event in a step and phase.
+
+        Args:
+            step (int): The step
+            phase (int): NODE or ARRIVAL
+
+        Returns:
+            list: Agents in order of their creation
+        """
+        agents = []
+        while(self.queue and self.queue[0][:2] == (step, phase)):
+            agent = heapq.heappop(self.queue)[3]
+            del self.scheduled[agent.id]
+            self.walking.pop(agent.id, None)
+            agents.append(agent)
+        return agents
+
+    def agents_walking_in(self, step):
+        """Return all agents which walked on their current edge for a full timestep in a step,
+            i.e. all scheduled agents that started walking on their edge before or in that step. 
+            The walking agents are kept between calls, only agents starting to walk since the last call are added.
+
+        Args:
+            step (int): The step
+
+        Returns:
+            list: Agents in order of their creation
+        """
+        for first_step in sorted(first_step for first_step in self.starting if first_step <= step):
+            for agent in self.starting.pop(first_step):
+                # agents popped or rescheduled since are left out
+                if(self.scheduled.get(agent.id) == first_step):
+                    self.walking[agent.id] = agent
+        return [self.walking[agent_id] for agent_id in sorted(self.walking)]
+
+
+class AgentGroups:
+    """Groups of agents selected in every model step, maintained incrementally by the agents whenever their state changes
+        (see Pedestrian.update_node_status), so that the model does not need to check all agents in every step.
+
+    Args:
+        model (ap.Model): The model
+        agents (ap.AgentList): All agents of the model
+    """
+
+    def __init__(self, model, agents):
+        self.model = model
+        self.agents = agents
+        # agents on a node which have not finished, by agent id
+        self.on_node = {}
+        # agents which stopped at a node in the current step
+        self.arrived = []
+        self.finished_count = 0
+        self._not_finished = agents
+
+    def update_on_node(self, agent):
+        """Add an agent to or remove it from the agents on a node, depending on its remaining distance to the next node.
+
+        Args:
+            agent (Pedestrian): Agent whose remaining distance or finished status changed
+        """
+        if(agent.remaining_dist_on_edge == 0 and not agent.finished):
+            self.on_node[agent.id] = agent
+        else:
+            self.on_node.pop(agent.id, None)
+
+    def arrive(self, agent):
+        """Register an agent which stopped at a node in the current step.
+
+        Args:
+            agent (Pedestrian): The agent
+        """
+        self.arrived.append(agent)
+        self.update_on_node(agent)
+
+    def finish(self, agent):
+        """Register an agent which finished walking.
+
+        Args:
+            agent (Pedestrian): The agent
+        """
+        self.finished_count += 1
+        self._not_finished = None
+        self.on_node.pop(agent.id, None)
+
+    def not_finished(self):
+        """Return all agents which have not finished walking (only rebuilt after agents finished).
+
+        Returns:
+            ap.AgentList: Agents in order of their creation
+        """
+        if(self._not_finished is None):
+            self._not_finished = self.agents.select(self.agents.finished == False)
+        return self._not_finished
+
+    def select_on_node(self):
+        """Return all agents on a node which have not finished walking.
+
+        Returns:
+            ap.AgentList: Agents in order of their creation
+        """
+        return ap.AgentList(self.model, [self.on_node[agent_id] for agent_id in sorted(self.on_node)])
+
+    def pop_arrived(self):
+        """Return and reset the agents which stopped at a node in the current step.
+
+        Returns:
+            ap.AgentList: Agents in order of their creation
+        """
+        arrived = sorted(self.arrived, key=lambda agent: agent.id)
+        self.arrived = []
+        return ap.AgentList(self.model, arrived)
@@ -1,30 +1,165 @@
 # if(self.model.p.destination_log):
+import datetime
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import networkx as nx
 import momepy
 
 
-def save_positions_to_file(position_list, out_name, sample_id, iteration ):
-    """Create gpkg file with all positions of all agents within the model run, annotated with a time and Agent-ID label."""
-    all_positions = pd.DataFrame(position_list) 
-    final_gdf = gpd.GeoDataFrame(all_positions, geometry=all_positions['geometry'], crs="EPSG:5652")
-    final_gdf.to_file('./Experiment/output/%s/positions_%s.gpkg' % (out_name, (str(sample_id) + "_" + str(iteration))), driver='GPKG', layer='Agents_temporal') 
+# edge attributes changing over time, stored in the npy file of the edge output
+EDGE_TIME_SERIES_COLUMNS = ['ppl_count', 'temp_ppl_increase', 'ppl_total', 'density', 'max_density', 'counter', 'time']
+# file formats of spatial outputs: gpkg (default, e.g. for qgis) or GeoParquet (requires pyarrow)
+OUTPUT_FORMATS = {'gpkg': '.gpkg', 'parquet': '.parquet'}
 
-def save_edges_to_file(edges, out_name, sample_id, iteration):
-    """Create gpkg file with one features for each edge in every timestep, annotated with the people counters and time label."""
-    final_edge_gdf = pd.concat(edges, ignore_index=True)        
-    final_edge_gdf.to_file('./Experiment/output/%s/edges_%s.gpkg' % (out_name, (str(sample_id) + "_" + str(iteration))), driver='GPKG', layer='Edges_temporal')
 
-def save_maximum_densities_to_file(graph, max_density, out_name, sample_id, iteration):
-    """Create gpkg file with edges, annotated with the maximum density per edge at any point in time over the full model running time."""
+def write_spatial_file(gdf, path, layer, output_format):
+    """Write a GeoDataFrame to path (without file extension) as gpkg or GeoParquet file. 
+        Returns the time needed for writing in seconds and the size of the written file in bytes."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format '%s', choose one of %s." % (output_format, ", ".join(OUTPUT_FORMATS)))
+    path = path + OUTPUT_FORMATS[output_format]
+    start = time.perf_counter()
+    if output_format == 'parquet':
+        gdf.to_parquet(path)
+    else:
+        gdf.to_file(path, driver='GPKG', layer=layer)
+    return time.perf_counter() - start, os.path.getsize(path)
+
+def read_spatial_file(path):
+    """Read a gpkg or GeoParquet file (depending on the file extension) as GeoDataFrame."""
+    if path.endswith(OUTPUT_FORMATS['parquet']):
+        return gpd.read_parquet(path)
+    return gpd.read_file(path)
+
+def find_spatial_file(path):
+    """Returns the path of an existing output file at path (without file extension) in any of the output formats."""
+    for extension in OUTPUT_FORMATS.values():
+        if os.path.exists(path + extension):
+            return path + extension
+    raise FileNotFoundError("No output file found at %s (%s)." % (path, ", ".join(OUTPUT_FORMATS.values())))
+
+
+
+def positions_to_gdf(data, node_labels, duration):
+    """Create a GeoDataFrame of recorded positions of agents (rows of recorders.TrajectoryRecorder.DTYPE), annotated with a time and Agent-ID label. 
+        Nodes are stored as strings, as origins and destinations on edges are named by strings."""
+    all_positions = pd.DataFrame({
+        'agentID': data['agentID'].astype(np.int64),
+        'route_counter': data['route_counter'].astype(np.int64),
+        'latest_node': np.array([str(node) for node in node_labels], dtype=object)[data['latest_node']],
+        'non_compliance': data['non_compliance'],
+        'compliance': data['compliance'],
+        'no_route_change': data['no_route_change'],
+        'random_rerouting': data['random_rerouting'],
+    })
+    counter = pd.Series(data['counter'].astype(np.int64))
+    all_positions['time'] = counter.map({step: fake_time(step, duration) for step in counter.unique().tolist()})
+    all_positions['counter'] = counter
+    # create point geometries from the x and y coordinates of the positions
+    geometry = gpd.points_from_xy(data['x'], data['y'])
+    return gpd.GeoDataFrame(all_positions, geometry=geometry, crs="EPSG:5652")
+
+class PositionsWriter:
+    """Writes the positions of agents recorded by recorders.TrajectoryRecorder to a gpkg or GeoParquet file block by block, 
+        whenever the recorder is flushed, so that the positions of the full model run are never held in memory at once. 
+        Blocks are appended to the layer of the gpkg file or written as row groups of the GeoParquet file (requires pyarrow).
+        The file is only created when the first block is written."""
+
+    def __init__(self, path, duration, output_format='gpkg'):
+        """Prepare writing to path (without file extension) with the time label of timesteps of duration seconds."""
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError("Unknown output format '%s', choose one of %s." % (output_format, ", ".join(OUTPUT_FORMATS)))
+        self.path = path + OUTPUT_FORMATS[output_format]
+        self.duration = duration
+        self.output_format = output_format
+        self.blocks = 0
+        self.parquet_writer = None
+        self.seconds = 0.0
+
+    def append(self, data, node_labels):
+        """Write a block of recorded positions (rows of recorders.TrajectoryRecorder.DTYPE, nodes as codes of node_labels)."""
+        start = time.perf_counter()
+        gdf = positions_to_gdf(data, node_labels, self.duration)
+        if self.blocks == 0:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.output_format == 'parquet':
+            import pyarrow.parquet as pq
+            from geopandas.io.arrow import _geopandas_to_arrow
+            table = _geopandas_to_arrow(gdf, index=False)
+            if self.parquet_writer is None:
+                # the bounding box in the metadata would only cover the first block, it is optional in GeoParquet
+                metadata = json.loads(table.schema.metadata[b'geo'])
+                for column in metadata['columns'].values():
+                    column.pop('bbox', None)
+                schema_metadata = dict(table.schema.metadata)
+                schema_metadata[b'geo'] = json.dumps(metadata).encode()
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema.with_metadata(schema_metadata))
+            self.parquet_writer.write_table(table)
+        else:
+            gdf.to_file(self.path, driver='GPKG', layer='Agents_temporal', mode='a' if self.blocks > 0 else 'w')
+        self.blocks += 1
+        self.seconds += time.perf_counter() - start
+
+    def close(self):
+        """Complete the file. Returns the time needed for writing all blocks in seconds and the size of the written file in bytes."""
+        if self.parquet_writer is not None:
+            start = time.perf_counter()
+            self.parquet_writer.close()
+            self.parquet_writer = None
+            self.seconds += time.perf_counter() - start
+        return self.seconds, os.path.getsize(self.path)
+
+def save_edges_to_file(edge_time_series, graph, out_name, sample_id, iteration, output_format='gpkg'):
+    """Complete npy file with the people counters and densities of all edges in every timestep (see recorders.EdgeTimeSeries) 
+        and create gpkg or GeoParquet file with the static attributes and geometries of the edges, in the column order of the npy file."""
+    run_name = str(sample_id) + "_" + str(iteration)
+    start = time.perf_counter()
+    series_path = edge_time_series.save()
+    series_time, series_size = time.perf_counter() - start, os.path.getsize(series_path)
+    edges = momepy.nx_to_gdf(graph, points=False)
+    edges = edges.drop(columns=[column for column in EDGE_TIME_SERIES_COLUMNS if column in edges.columns])
+    geometry_time, geometry_size = write_spatial_file(edges, './Experiment/output/%s/edge_geometries_%s' % (out_name, run_name), 'Edges', output_format)
+    return series_time + geometry_time, series_size + geometry_size
+
+def convert_edges_to_gpkg(out_name, sample_id, iteration, duration, output_format='gpkg'):
+    """Create gpkg (or GeoParquet) file with one feature for each edge in every timestep, annotated with the people counters and time label, 
+        from the files created by save_edges_to_file (e.g. for temporal visualization in qgis)."""
+    run_name = str(sample_id) + "_" + str(iteration)
+    series = np.load('./Experiment/output/%s/edges_%s.npy' % (out_name, run_name))
+    geometries = read_spatial_file(find_spatial_file('./Experiment/output/%s/edge_geometries_%s' % (out_name, run_name)))
+    steps, edge_count = series.shape
+    # repeat the edges for every timestep
+    edges = geometries.iloc[np.tile(np.arange(edge_count), steps)].reset_index(drop=True)
+    geometry = edges.pop('geometry')
+    edges['ppl_count'] = series['ppl_count'].ravel().astype(np.int64)
+    # counter changes are reset and maximum densities are not tracked within timesteps
+    edges['temp_ppl_increase'] = 0
+    edges['ppl_total'] = series['ppl_total'].ravel().astype(np.int64)
+    edges['density'] = series['density'].ravel().astype(np.float64)
+    edges['max_density'] = 0
+    edges['counter'] = np.repeat(np.arange(steps), edge_count)
+    edges['time'] = np.repeat([fake_time(step, duration) for step in range(steps)], edge_count)
+    final_edge_gdf = gpd.GeoDataFrame(edges, geometry=geometry, crs=geometries.crs)
+    write_spatial_file(final_edge_gdf, './Experiment/output/%s/edges_%s' % (out_name, run_name), 'Edges_temporal', output_format)
+
+def fake_time(step, duration):
+    """Returns a fake date for a timestep for temporal visualization in qgis."""
+    return datetime.datetime(2000, 1, 1, step * duration // 3600, (step * duration // 60) % 60 , step * duration % 60)
+
+def save_maximum_densities_to_file(graph, max_density, out_name, sample_id, iteration, output_format='gpkg'):
+    """Create gpkg or GeoParquet file with edges, annotated with the maximum density per edge at any point in time over the full model running time."""
     nx.set_edge_attributes(graph, max_density, "max_density")
     max_density_gdf = momepy.nx_to_gdf(graph, points=False)
-    max_density_gdf.to_file("./Experiment/output/%s/max_density_%s.gpkg" % (out_name, (str(sample_id) + "_" + str(iteration))), driver='GPKG', layer='Max Density Edges') 
+    return write_spatial_file(max_density_gdf, "./Experiment/output/%s/max_density_%s" % (out_name, (str(sample_id) + "_" + str(iteration))), 'Max Density Edges', output_format)
 
-def save_compliance_nodes_to_file(nodes, out_name, sample_id, iteration):   
-    """Create gpkg file with node positions, annotated with the amount of compliances at each node."""
-    nodes[['degree', 'nodeID', 'geometry', 'compliances','non_compliances', 'random_reroutings', 'no_route_changes']].to_file('./Experiment/output/%s/compliance_locations_%s.gpkg' % (out_name, (str(sample_id) + "_" + str(iteration))), driver='GPKG', layer='Compliance Occurences')
+def save_compliance_nodes_to_file(nodes, out_name, sample_id, iteration, output_format='gpkg'):   
+    """Create gpkg or GeoParquet file with node positions, annotated with the amount of compliances at each node."""
+    compliance_nodes = nodes[['degree', 'nodeID', 'geometry', 'compliances','non_compliances', 'random_reroutings', 'no_route_changes']]
+    return write_spatial_file(compliance_nodes, './Experiment/output/%s/compliance_locations_%s' % (out_name, (str(sample_id) + "_" + str(iteration))), 'Compliance Occurences', output_format)
 
 def save_destinations_to_file(destination_list, out_name):
     """Create gpkg file with all destinations."""
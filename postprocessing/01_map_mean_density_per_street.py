@@ -1,4 +1,3 @@
-import fiona
 import json
 import os
 from pathlib import Path
@@ -11,6 +10,7 @@ import random
 import numpy as np
 import scipy.stats as st
 import seaborn as sns
+from edge_outputs import read_edge_features, is_edge_output, read_spatial_file
 
 
 
@@ -26,7 +26,7 @@ def sort_by_street(input_file):
     """
     dict = {}
     for file in input_file:
-        shape = fiona.open(file)
+        shape = read_edge_features(file)
         for feat in shape:
             if not feat['properties']['ID'] in dict:
                 dict[feat['properties']['ID']] = []
@@ -66,7 +66,7 @@ def write_to_gpk(outfile, infile, density_stats):
         and produces new geopackage file with attributes mean, median and std of max_density for all features.
     """
 
-    gdf = geopandas.read_file(infile)
+    gdf = read_spatial_file(infile)
     col_list = ['ID', 'one_way', 'one_way_reversed', 'mm_len', 'geometry']
     gdf = gdf[col_list]
     means = []
@@ -164,7 +164,7 @@ max_density_files = list()
 for (dirpath, dirnames, filenames) in os.walk(base_path):
     for file in filenames:
         if file.startswith("edges_"):
-            if file.endswith(".gpkg"):
+            if is_edge_output(file, filenames):
                 if file.startswith("edges_0"):
                     no_comp_files += [os.path.join(dirpath, file)]
                 elif file.startswith("edges_1"):
@@ -172,7 +172,7 @@ for (dirpath, dirnames, filenames) in os.walk(base_path):
                 elif file.startswith("edges_2"):
                     cali_comp_files += [os.path.join(dirpath, file)]
         elif file.startswith("max_density_"):
-            if file.endswith(".gpkg"):
+            if file.endswith((".gpkg", ".parquet")):
                 max_density_files += [os.path.join(dirpath, file)]
 
 Path("%s/averages/" % base_path).mkdir(parents=True, exist_ok=True)
@@ -1,4 +1,3 @@
-import fiona
 import json
 import os
 from pathlib import Path
@@ -13,6 +12,7 @@ import scipy.stats as st
 import json
 import seaborn as sns
 import itertools
+from edge_outputs import read_edge_features, is_edge_output, read_spatial_file
 
 
 
@@ -27,7 +27,7 @@ def sort_by_street(input_file, output_name):
     """
     density_list = []
     for file in input_file:
-        shape = fiona.open(file)
+        shape = read_edge_features(file)
         for feat in shape:
             density_list.append([feat['properties']['ID'], feat['properties']['density']])
     all_dens = pd.DataFrame(density_list, columns=['ID','density'])
@@ -104,7 +104,7 @@ for i in ids:
     for (dirpath, dirnames, filenames) in os.walk(text):
         for file in filenames:
             if file.startswith("edges_"):
-                if file.endswith(".gpkg"):
+                if is_edge_output(file, filenames):
                     if file.startswith("edges_0"):
                         no_comp_files += [os.path.join(dirpath, file)]
                     elif file.startswith("edges_1"):
@@ -0,0 +1,45 @@
+""" Readers of the edge outputs of model runs (npy time series, gpkg or GeoParquet files), shared by the postprocessing scripts.
+"""
+import fiona
+import os
+import pandas as pd
+import geopandas
+import numpy as np
+
+
+def read_spatial_file(file):
+    """ Reads a gpkg or GeoParquet model output file (depending on the file extension) as GeoDataFrame.
+    """
+    if file.endswith(".parquet"):
+        return geopandas.read_parquet(file)
+    return geopandas.read_file(file)
+
+
+def read_edge_features(file):
+    """ Reads the ID and density of all edges in all timesteps from an edge output file, either as npy file with a time series of all edges 
+        (read together with the edge_geometries file of the same model run) or as gpkg or GeoParquet file with one feature per edge and timestep.
+        Returns:
+            List [{'properties': {'ID': 1, 'density': 0.12}}, ...]
+    """
+    if file.endswith(".npy"):
+        geometry_file = os.path.join(os.path.dirname(file), os.path.basename(file).replace("edges_", "edge_geometries_", 1)[:-len(".npy")])
+        geometry_file += ".gpkg" if os.path.isfile(geometry_file + ".gpkg") else ".parquet"
+        ids = read_spatial_file(geometry_file)['ID'].tolist()
+        densities = np.load(file)['density'].astype(float)
+        return [{'properties': {'ID': id, 'density': density}} for row in densities for id, density in zip(ids, row.tolist())]
+    if file.endswith(".parquet"):
+        edges = pd.read_parquet(file, columns=['ID', 'density'])
+        return [{'properties': {'ID': id, 'density': density}} for id, density in zip(edges['ID'].tolist(), edges['density'].tolist())]
+    return fiona.open(file)
+
+
+def is_edge_output(file, filenames):
+    """ Checks whether a file is an edge output file. Gpkg or GeoParquet files converted from npy files (see spatial_output_creator.convert_edges_to_gpkg) 
+        are skipped, so that the edges of a model run are read only once.
+    """
+    if file.endswith(".npy"):
+        return True
+    for extension in (".gpkg", ".parquet"):
+        if file.endswith(extension):
+            return file[:-len(extension)] + ".npy" not in filenames
+    return False
@@ -1,4 +1,3 @@
-import fiona
 import json
 import os
 from pathlib import Path
@@ -12,6 +11,7 @@ import numpy as np
 import scipy.stats as st
 import json
 import seaborn as sns
+from edge_outputs import read_edge_features, is_edge_output, read_spatial_file
 
 
 
@@ -26,7 +26,7 @@ def sort_by_street(input_file, output_name):
     """
     density_list = []
     for file in input_file:
-        shape = fiona.open(file)
+        shape = read_edge_features(file)
         for feat in shape:
             density_list.append([feat['properties']['ID'], feat['properties']['density']])
     all_dens = pd.DataFrame(density_list, columns=['ID','density'])
@@ -65,7 +65,7 @@ for index, i in enumerate(ids, start=0):
     for (dirpath, dirnames, filenames) in os.walk("Experiment/output/"):
         for file in filenames:
             if file.startswith("edges_" + str(index)):
-                if file.endswith(".gpkg"):
+                if is_edge_output(file, filenames):
                     if dirpath.startswith("Experiment/output/0_ows"):
                         zero_ows_files += [os.path.join(dirpath, file)]
                     if dirpath.startswith("Experiment/output/4_ows"):